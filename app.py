@@ -1,12 +1,21 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from src.collector import GitCollector
+from src.collector import GitCollector, snapshot_interval
+from src.history import HistoryFilter, head_sha
+from src.coupling import force_layout
+from src.jobs import JobRegistry
+from src.metrics import calculate_kpis
 from src.analyzer import AIAnalyzer
+from src.payload import describe_savings
+from src.profiling import Profiler
+from src.snapshot import MANIFEST, load_collector
 import google.generativeai as genai
+import hashlib
+import json
 import os
+import time
 from pyvis.network import Network
-import tempfile
 import streamlit.components.v1 as components
 
 st.set_page_config(
@@ -15,20 +24,109 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data(show_spinner=False)
-def analyze_repository(repo_path: str, num_commits: int):
+# Colunas de cada arquivo que vão para a IA: a autoria segue resumida (autor principal, fatia e nº de autores)
+AI_COLUMNS = ["file", "churn", "complexity", "risk_score", "top_author", "top_author_share", "author_count", "is_hotspot"]
+
+
+@st.cache_resource
+def analysis_store():
+    """
+    Análises compartilhadas entre sessões e reruns do dashboard, uma entrada por
+    (repositório, backend). Cada entrada guarda o HEAD em que foi minerada, os fatos da
+    maior janela já minerada e os resultados prontos de cada tamanho de janela.
+    """
+    return {}
+
+
+@st.cache_resource
+def job_registry():
+    """Análises rodando em segundo plano, uma por (repositório, HEAD, backend, recorte, commits), para todas as sessões."""
+    return JobRegistry()
+
+
+def analyze_repository(repo_path: str, num_commits: int, workers: int = 1, backend: str = "pydriller",
+                       on_snapshot=None, should_stop=None, store=None, history: HistoryFilter = None):
     """
-    Minera o repositório Git e retorna métricas.
-    Cache é essencial pois o processo pode ser demorado.
+    Minera o repositório Git e retorna métricas (um DataFrame com uma linha por arquivo tocado).
+    Os resultados valem enquanto o HEAD não muda; novos commits invalidam a entrada.
+    Uma janela menor que a maior já minerada é recortada dos fatos em memória, sem git.
+    Enquanto minera, `on_snapshot` recebe os resultados parciais; se `should_stop()`
+    ficar verdadeiro, a mineração para e a função retorna None.
+    Em threads de segundo plano, `store` deve vir de fora (analysis_store só roda na thread do script).
+    `history` recorta o histórico no próprio git (datas, branch, merges, caminhos); cada recorte tem sua entrada.
     """
+    if store is None:
+        store = analysis_store()
+    history = history or HistoryFilter()
+    head = head_sha(repo_path, history.rev)
+    entry_key = (os.path.abspath(repo_path), backend, history)
+    entry = store.get(entry_key)
+    if entry is None or entry["head"] != head:
+        entry = store[entry_key] = {"head": head, "facts": [], "complete": False, "results": {}}
+    if num_commits in entry["results"]:
+        return entry["results"][num_commits]
+
+    # `complete`: a última mineração pediu mais commits do que o histórico tem
+    reuse = entry["facts"] and (len(entry["facts"]) >= num_commits or entry["complete"])
+    profiler = Profiler()
     try:
-        collector = GitCollector(repo_path, limit_commits=num_commits)
-        metrics = collector.collect_metrics()
+        collector = GitCollector(repo_path, limit_commits=num_commits, workers=workers, backend=backend,
+                                 profiler=profiler, facts=entry["facts"] if reuse else None, history=history)
+        snapshots = collector.iter_metrics(snapshot_every=0 if reuse else snapshot_interval(num_commits))
+        for snapshot in snapshots:
+            if on_snapshot and not snapshot['done']:
+                on_snapshot(snapshot)
+            if should_stop and should_stop():
+                # Fechar o gerador encerra a mineração; os commits já minerados ficam no cache em disco
+                snapshots.close()
+                return None
+        metrics = collector.file_metrics
         coupling = collector.get_coupling_analysis(min_shared_commits=3)
         logical_coupling = collector.get_logical_coupling(min_shared_commits=2)
-        return metrics, coupling, logical_coupling, None
+        with profiler.span("complexity.trend"):
+            trends = collector.get_complexity_trend(samples=10)
+        ownership = collector.get_truck_factor()
+        activity = collector.get_activity()
     except Exception as e:
-        return None, None, None, str(e)
+        return None, None, None, None, None, None, None, str(e)
+
+    # Só guarda os fatos se o HEAD não andou durante a mineração
+    window = collector.window
+    if not reuse and len(window) > len(entry["facts"]) and (not window or window[0].sha == head):
+        entry["facts"] = window
+        entry["complete"] = len(window) < num_commits
+
+    profile = {**profiler.report(), "trace": profiler.chrome_trace()}
+    entry["results"][num_commits] = (metrics, coupling, logical_coupling, trends, ownership, activity, profile, None)
+    return entry["results"][num_commits]
+
+
+def snapshot_mtime(path: str):
+    """Data de modificação do manifesto do snapshot: regravar a pasta invalida o cache."""
+    try:
+        return os.path.getmtime(os.path.join(path, MANIFEST))
+    except OSError:
+        return None
+
+
+@st.cache_resource(max_entries=8, show_spinner="Abrindo snapshot...")
+def open_snapshot(path: str, mtime):
+    """
+    Resultados de um snapshot gravado por `scan --export`, no mesmo formato de
+    analyze_repository. As tabelas Arrow são mapeadas em memória e os acoplamentos saem
+    da matriz salva, sem git. Fica em cache até o manifesto mudar (`mtime`).
+    """
+    profiler = Profiler()
+    with profiler.span("snapshot.load"):
+        collector, manifest = load_collector(path)
+    collector.profiler = profiler
+    coupling = collector.get_coupling_analysis(min_shared_commits=3)
+    logical_coupling = collector.get_logical_coupling(min_shared_commits=2)
+    ownership = collector.get_truck_factor()
+    profile = {**profiler.report(), "trace": profiler.chrome_trace()}
+    results = (collector.file_metrics, coupling, logical_coupling, manifest.get("trends") or {}, ownership,
+               collector.activity, profile, None)
+    return {"manifest": manifest, "results": results}
 
 
 def get_file_extension(filename: str) -> str:
@@ -38,59 +136,94 @@ def get_file_extension(filename: str) -> str:
     return 'unknown'
 
 
-def render_coupling_network(logical_coupling_data, filtered_file_types=None):
-    if not logical_coupling_data['nodes']:
+def graph_key(logical_coupling_data) -> str:
+    """Hash do grafo (nós, tamanhos, dicas e arestas): identifica o layout e o HTML em cache."""
+    digest = hashlib.sha1()
+    for node in logical_coupling_data['nodes']:
+        digest.update(f"{node['id']}\0{node['size']:.3f}\0{node['title']}\0".encode())
+    for edge in logical_coupling_data['edges']:
+        digest.update(f"{edge['source']}\0{edge['target']}\0{edge['weight']}\0".encode())
+    return digest.hexdigest()
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def coupling_layout(key: str, _logical_coupling_data):
+    """
+    Posições (x, y) em pixels de cada nó, calculadas uma vez por grafo no servidor.
+    O layout é do grafo inteiro: filtrar tipos de arquivo não move os nós que ficam.
+    """
+    nodes = _logical_coupling_data['nodes']
+    index = {node['id']: i for i, node in enumerate(nodes)}
+    edges = _logical_coupling_data['edges']
+    positions = force_layout(
+        len(nodes),
+        [index[edge['source']] for edge in edges],
+        [index[edge['target']] for edge in edges],
+        [edge['weight'] for edge in edges],
+    )
+    # Área do desenho cresce com o número de nós, para os rótulos não se sobreporem
+    scale = 150 * max(1.0, len(nodes) ** 0.5)
+    return {node['id']: (float(x) * scale, float(y) * scale) for node, (x, y) in zip(nodes, positions)}
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_coupling_network(key: str, _logical_coupling_data, filtered_file_types=None):
+    """
+    HTML do diagrama, em memória, por (grafo, tipos de arquivo). Os nós já vêm
+    posicionados e a física fica desligada: o navegador só desenha, sem estabilização.
+    """
+    if not _logical_coupling_data['nodes']:
         return None
-    
+
     net = Network(
         height="700px",
         width="100%",
         directed=False,
         notebook=True
     )
-    
+
     net.set_options("""
     {
         "physics": {
-            "enabled": true,
-            "stabilization": {
-                "iterations": 200
-            },
-            "barnesHut": {
-                "gravitationalConstant": -40000,
-                "centralGravity": 0.3,
-                "springLength": 300,
-                "springConstant": 0.04
-            }
+            "enabled": false
+        },
+        "edges": {
+            "smooth": false
         }
     }
     """)
-    
-    nodes_to_add = logical_coupling_data['nodes']
-    if filtered_file_types and len(filtered_file_types) > 0:
+
+    positions = coupling_layout(key, _logical_coupling_data)
+
+    nodes_to_add = _logical_coupling_data['nodes']
+    if filtered_file_types:
         nodes_to_add = [
-            node for node in logical_coupling_data['nodes']
+            node for node in _logical_coupling_data['nodes']
             if get_file_extension(node['label']) in filtered_file_types
         ]
-    
+
     node_ids_to_add = {node['id'] for node in nodes_to_add}
-    
+
     for node in nodes_to_add:
+        x, y = positions[node['id']]
         net.add_node(
             node['id'],
             label=node['label'],
             size=node['size'],
             color=node['color'],
-            title=node['title']
+            title=node['title'],
+            x=x,
+            y=y,
+            physics=False
         )
-    
-    max_weight = logical_coupling_data['stats']['max_coupling_strength']
-    
-    for edge in logical_coupling_data['edges']:
+
+    max_weight = _logical_coupling_data['stats']['max_coupling_strength']
+
+    for edge in _logical_coupling_data['edges']:
         if edge['source'] in node_ids_to_add and edge['target'] in node_ids_to_add:
             weight = edge['weight']
             thickness = 1 + (weight / max_weight * 9) if max_weight > 0 else 1
-            
+
             net.add_edge(
                 edge['source'],
                 edge['target'],
@@ -99,48 +232,37 @@ def render_coupling_network(logical_coupling_data, filtered_file_types=None):
                 width=thickness,
                 color='rgba(75, 139, 255, 0.6)'
             )
-    
-    html_str = net.generate_html()
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as f:
-        f.write(html_str)
-        return f.name
-
-
-
-def format_authors(authors_dict):
-    """Formata dicionário de autores para exibição."""
-    if not authors_dict:
-        return "N/A"
-    return ", ".join([f"{name} ({count})" for name, count in authors_dict.items()])
-
 
-def calculate_kpis(df):
-    """Calcula KPIs principais do dashboard."""
-    total_files = len(df)
-    avg_risk = df["risk_score"].mean() if not df.empty else 0
-    
-    bus_factor = 0
-    for _, row in df.iterrows():
-        authors = row["top_authors"]
-        if authors:
-            total_changes = sum(authors.values())
-            top_author_changes = max(authors.values())
-            if (top_author_changes / total_changes) > 0.8:
-                bus_factor += 1
-    
-    return total_files, avg_risk, bus_factor
+    return net.generate_html()
 
 
 st.sidebar.title("Configurações")
 st.sidebar.markdown("---")
 
-repo_path = st.sidebar.text_input(
-    "Caminho do Repositório (Local)",
-    value="",
-    placeholder="C:/Users/seu-nome/seu-repo",
-    help="Digite o caminho completo do repositório Git local"
+source = st.sidebar.radio(
+    "Fonte dos Dados",
+    options=["Repositório Git", "Snapshot salvo"],
+    horizontal=True,
+    help="'Snapshot salvo' abre as métricas gravadas por `scan --export`, sem minerar o repositório"
 )
 
+if source == "Snapshot salvo":
+    snapshot_path = st.sidebar.text_input(
+        "Pasta do Snapshot",
+        value="",
+        placeholder="C:/Users/seu-nome/snapshots/seu-repo",
+        help="Pasta criada por `python -m src.cli scan <repo> --export <pasta>`"
+    )
+    repo_path = ""
+else:
+    snapshot_path = ""
+    repo_path = st.sidebar.text_input(
+        "Caminho do Repositório (Local)",
+        value="",
+        placeholder="C:/Users/seu-nome/seu-repo",
+        help="Digite o caminho completo do repositório Git local"
+    )
+
 api_key = st.sidebar.text_input(
     "API Key do Google (Gemini)",
     type="password",
@@ -154,19 +276,54 @@ num_commits = st.sidebar.slider(
     max_value=500,
     value=100,
     step=10,
-    help="Mais commits = análise mais completa, mas mais lenta"
+    help="Mais commits = análise mais completa, mas mais lenta",
+    disabled=source == "Snapshot salvo"
+)
+
+workers = st.sidebar.number_input(
+    "Processos de Mineração",
+    min_value=1,
+    max_value=os.cpu_count() or 1,
+    value=1,
+    step=1,
+    help="Minera blocos de commits em paralelo. Útil em repositórios grandes e máquinas com vários núcleos",
+    disabled=source == "Snapshot salvo"
 )
 
+backend = st.sidebar.selectbox(
+    "Coletor de Histórico",
+    options=["pydriller", "numstat"],
+    index=0,
+    help="'numstat' lê apenas as contagens de linhas do `git log --numstat`, sem montar diffs. Muito mais rápido em históricos grandes",
+    disabled=source == "Snapshot salvo"
+)
+
+with st.sidebar.expander("Recorte do Histórico"):
+    disabled = source == "Snapshot salvo"
+    since = st.text_input("Desde", placeholder="2024-01-01 ou 6 months ago", disabled=disabled,
+                          help="Qualquer data aceita pelo git; vazio = sem limite")
+    until = st.text_input("Até", placeholder="2024-12-31", disabled=disabled)
+    branch = st.text_input("Branch", placeholder="HEAD", disabled=disabled,
+                           help="Branch, tag ou SHA a percorrer. A complexidade continua vindo da árvore de trabalho")
+    scope = st.text_input("Caminhos", placeholder="services/api, libs/auth", disabled=disabled,
+                          help="Só commits e arquivos sob estes caminhos (separados por vírgula). Em monorepos, o custo acompanha o tamanho do recorte")
+    first_parent = st.checkbox("Só o primeiro pai (--first-parent)", disabled=disabled)
+    no_merges = st.checkbox("Ignorar merges (--no-merges)", disabled=disabled)
+history = HistoryFilter.build(since, until, branch, first_parent, no_merges, scope.split(","))
+
 st.sidebar.markdown("---")
 
 if st.sidebar.button("Limpar Cache e Recarregar"):
     st.cache_data.clear()
+    open_snapshot.clear()
+    analysis_store().clear()
+    job_registry().clear()
     st.rerun()
 
 st.sidebar.markdown("---")
 st.sidebar.info(
-    "**Dica:** O cache acelera análises repetidas. "
-    "Use 'Limpar Cache' apenas se mudar o repositório."
+    "**Dica:** O cache acelera análises repetidas e é renovado sozinho quando há commits novos. "
+    "Reduzir o número de commits reaproveita a mineração já feita."
 )
 
 st.title("Repo Health AI")
@@ -176,39 +333,114 @@ st.markdown(
 )
 st.markdown("---")
 
-if not repo_path:
-    st.warning("Configure o caminho do repositório na barra lateral para começar.")
-    st.stop()
-
-if not os.path.exists(repo_path):
-    st.error(f"Caminho inválido: `{repo_path}`. Verifique se o diretório existe.")
-    st.stop()
-
 if api_key:
     genai.configure(api_key=api_key)
 
-with st.spinner(f"Analisando os últimos {num_commits} commits... (pode levar alguns minutos)"):
-    metrics, coupling, logical_coupling, error = analyze_repository(repo_path, num_commits)
+if source == "Snapshot salvo":
+    if not snapshot_path:
+        st.warning("Informe a pasta do snapshot na barra lateral para começar.")
+        st.stop()
+    try:
+        snapshot = open_snapshot(os.path.abspath(snapshot_path), snapshot_mtime(snapshot_path))
+    except (OSError, ValueError) as e:
+        st.error(f"Não foi possível abrir o snapshot: {e}")
+        st.stop()
+    metrics, coupling, logical_coupling, trends, ownership, activity, profile, error = snapshot["results"]
+    manifest = snapshot["manifest"]
+    repo_path = manifest["repo_path"]
+    num_commits = manifest["commits_analyzed"]
+    head = (manifest["head"] or "")[:10]
+    st.info(
+        f"Snapshot de `{repo_path}` ({num_commits} commits, HEAD `{head}`), gravado em "
+        f"{time.strftime('%d/%m/%Y %H:%M', time.localtime(manifest['created_at']))}. "
+        f"Nada foi minerado: as métricas vêm dos arquivos salvos."
+    )
+    recorte = HistoryFilter.build(**manifest["history"]).describe() if manifest.get("history") else ""
+    if recorte:
+        st.caption(f"Recorte do histórico: {recorte}")
+else:
+    if not repo_path:
+        st.warning("Configure o caminho do repositório na barra lateral para começar.")
+        st.stop()
+
+    if not os.path.exists(repo_path):
+        st.error(f"Caminho inválido: `{repo_path}`. Verifique se o diretório existe.")
+        st.stop()
+
+    if history.rev != "HEAD" and head_sha(repo_path, history.rev) is None:
+        st.error(f"Referência `{history.rev}` não encontrada no repositório.")
+        st.stop()
+
+    job_key = (os.path.abspath(repo_path), head_sha(repo_path, history.rev), backend, history, num_commits)
+    registry = job_registry()
+    job = registry.get(job_key)
+
+    if st.session_state.get("cancelled_analysis") == job_key and (job is None or not job.running):
+        st.info(
+            "Análise cancelada. Os commits já minerados ficaram no cache em disco: "
+            "ao retomar, a mineração continua de onde parou."
+        )
+        if st.button("Retomar análise", type="primary"):
+            del st.session_state["cancelled_analysis"]
+            st.rerun()
+        st.stop()
+
+    store = analysis_store()
+    job = registry.get_or_start(job_key, lambda job: analyze_repository(
+        repo_path, num_commits, int(workers), backend,
+        on_snapshot=job.publish, should_stop=job.should_stop, store=store, history=history
+    ))
+    # Resultados em cache ou recortados de uma janela maior ficam prontos quase na hora
+    job.wait(timeout=0.3)
+
+    if job.running:
+        snapshot = job.partial
+        total = (snapshot or {}).get("total_commits") or num_commits
+        done = (snapshot or {}).get("commits_analyzed", 0)
+        st.progress(
+            min(1.0, done / total),
+            text=f"Analisando commits em segundo plano... {done}/{total} "
+                 f"({time.time() - job.started:.0f}s). Você pode mudar os parâmetros: esta análise continua rodando."
+        )
+        if st.button("Cancelar análise"):
+            job.cancel()
+            st.session_state["cancelled_analysis"] = job_key
+            st.rerun()
+        if snapshot and snapshot["hotspots"]:
+            st.markdown("**Top Hotspots até agora** (Risk Score)")
+            st.bar_chart(pd.DataFrame(snapshot["hotspots"]).set_index("file")["risk_score"])
+        others = len(registry.running()) - 1
+        if others > 0:
+            st.caption(f"Outras {others} análises rodando em segundo plano.")
+        time.sleep(0.5)
+        st.rerun()
+
+    if job.state == "error":
+        st.error(f"Erro ao analisar o repositório: {job.error}")
+        st.stop()
+
+    if job.result is None:
+        # Cancelada por outra sessão que compartilhava a mesma análise: o próximo rerun começa outra
+        st.rerun()
+
+    metrics, coupling, logical_coupling, trends, ownership, activity, profile, error = job.result
 
 if error:
     st.error(f"Erro ao analisar o repositório: {error}")
     st.stop()
 
-if not metrics:
+if metrics is None or metrics.empty:
     st.warning("Nenhuma métrica foi coletada. Verifique se o repositório possui commits.")
     st.stop()
 
-df = pd.DataFrame(metrics)
-
-threshold = df["risk_score"].quantile(0.7)
-df["is_hotspot"] = df["risk_score"] > threshold
-
-df["authors_display"] = df["top_authors"].apply(format_authors)
+# O DataFrame do store é compartilhado entre sessões: colunas novas vão numa cópia rasa
+threshold = metrics["risk_score"].quantile(0.7)
+df = metrics.assign(is_hotspot=metrics["risk_score"] > threshold)
 
 total_files, avg_risk, bus_factor = calculate_kpis(df)
 
 st.markdown("### Indicadores Principais")
-col1, col2, col3 = st.columns(3)
+col1, col2, col3, col4 = st.columns(4)
 
 with col1:
     st.metric(
@@ -233,6 +465,22 @@ with col3:
         help="Arquivos onde >80% das mudanças vêm de 1 pessoa"
     )
 
+with col4:
+    if ownership:
+        st.metric(
+            label="Truck Factor",
+            value=f"{ownership['truck_factor']}",
+            delta=f"{ownership['orphaned_files']} arquivos órfãos sem essas pessoas",
+            delta_color="off",
+            help=(
+                "Menor número de pessoas cuja saída deixa mais da metade dos arquivos sem ninguém "
+                "que os conheça (autor principal ou com ao menos 25% das mudanças). "
+                f"Pessoas: {', '.join(ownership['authors'][:10])}"
+            )
+        )
+    else:
+        st.metric(label="Truck Factor", value="-", help="Snapshot gravado sem a autoria completa dos arquivos")
+
 st.markdown("---")
 
 tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -282,6 +530,76 @@ with tab1:
         hide_index=True,
     )
 
+    if activity is not None and len(activity.timeline("week")):
+        st.markdown("---")
+        st.markdown("### Atividade por Período")
+        st.caption(
+            "Churn, commits e autores por arquivo na janela escolhida, respondidos pelas séries "
+            "já calculadas: mudar a janela não minera o histórico de novo."
+        )
+        bucket_label = st.radio("Período", ["Semana", "Dia"], horizontal=True, key="activity_bucket")
+        timeline = activity.timeline("week" if bucket_label == "Semana" else "day")
+        dates = [time.strftime("%d/%m/%Y", time.gmtime(start)) for start in timeline.bucket_starts()]
+        if len(dates) > 1:
+            first, last = st.select_slider(
+                "Janela", options=list(range(len(dates))), value=(0, len(dates) - 1),
+                format_func=lambda i: dates[i], key=f"activity_window_{timeline.bucket}"
+            )
+        else:
+            first, last = 0, 0
+        lo, hi = first, last + 1
+        window = timeline.window(lo, hi)
+
+        activity_columns = {
+            "file": st.column_config.TextColumn("Arquivo", width="medium"),
+            "churn": st.column_config.NumberColumn("Churn", format="%d"),
+            "commits": st.column_config.NumberColumn("Commits", format="%d"),
+            "authors": st.column_config.NumberColumn("Autores", format="%d"),
+            "trend": st.column_config.NumberColumn("Tendência", format="%+.1f", help="Variação do churn por período (mínimos quadrados)"),
+            "series": st.column_config.LineChartColumn("Churn no período"),
+        }
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            st.markdown("**Mais alterados na janela:**")
+            busiest = window.sort_values(["churn", "file"], ascending=[False, True], kind="stable").head(10)
+            st.dataframe(
+                busiest.assign(series=timeline.series(busiest.index, lo, hi).tolist()),
+                column_config=activity_columns, hide_index=True
+            )
+        with col2:
+            st.markdown("**Esquentando (churn crescendo):**")
+            heating = timeline.heating_up(lo, hi, 10)
+            if heating.empty:
+                st.info("Nenhum arquivo com churn crescente nesta janela.")
+            else:
+                st.dataframe(
+                    heating.assign(series=timeline.series(heating.index, lo, hi).tolist()),
+                    column_config=activity_columns, hide_index=True
+                )
+
+    if trends:
+        st.markdown("---")
+        st.markdown("### Evolução da Complexidade dos Hotspots")
+        st.caption("Complexidade ciclomática em commits amostrados ao longo da janela analisada, lida direto do histórico.")
+
+        trend_rows = [
+            {"file": file, "data": pd.to_datetime(point["timestamp"], unit="s"), "complexity": point["complexity"]}
+            for file, points in trends.items()
+            for point in points
+            if point["complexity"] is not None
+        ]
+        if trend_rows:
+            fig_trend = px.line(
+                pd.DataFrame(trend_rows),
+                x="data",
+                y="complexity",
+                color="file",
+                markers=True,
+                labels={"data": "Data do Commit", "complexity": "Complexidade Ciclomática", "file": "Arquivo"},
+                height=450
+            )
+            st.plotly_chart(fig_trend)
+
 with tab2:
     st.markdown("### Matriz de Risco: Churn vs Complexidade")
     st.markdown(
@@ -348,12 +666,10 @@ with tab2:
             value=0
         )
     
-    filtered_df = df.copy()
-    
+    mask = df["risk_score"] >= min_risk
     if show_only_hotspots:
-        filtered_df = filtered_df[filtered_df["is_hotspot"]]
-    
-    filtered_df = filtered_df[filtered_df["risk_score"] >= min_risk]
+        mask &= df["is_hotspot"]
+    filtered_df = df[mask]
     
     st.dataframe(
         filtered_df[["file", "churn", "complexity", "risk_score", "authors_display", "is_hotspot"]],
@@ -393,10 +709,16 @@ with tab3:
                     "Commits Compartilhados",
                     format="%d"
                 ),
-                "strength": st.column_config.TextColumn("Força do Acoplamento")
+                "strength": st.column_config.TextColumn("Força do Acoplamento"),
+                "estimated": None
             },
             hide_index=True
         )
+        if coupling_df.get("estimated", pd.Series(dtype=bool)).any():
+            st.caption(
+                "Histórico grande: commits compartilhados estimados por MinHash (inclui commits "
+                "com mais de 50 arquivos, que a contagem exata ignora)."
+            )
         
         st.markdown("---")
         st.markdown("### Top 5 Acoplamentos Mais Fortes")
@@ -447,6 +769,13 @@ with tab4:
         with col3:
             st.metric("Força Máxima", int(logical_coupling['stats']['max_coupling_strength']))
         
+        candidate_edges = logical_coupling['stats'].get('candidate_edges', 0)
+        if candidate_edges > logical_coupling['stats']['total_edges']:
+            st.caption(
+                f"Exibindo as {logical_coupling['stats']['total_edges']} conexões mais fortes "
+                f"de {candidate_edges} detectadas (até 5 por arquivo)."
+            )
+        
         st.markdown("---")
         
         file_types = set()
@@ -475,12 +804,13 @@ with tab4:
         
         st.markdown("---")
         
-        html_file = render_coupling_network(logical_coupling, selected_file_types if selected_file_types else None)
+        with st.spinner("Calculando o layout do grafo..."):
+            html_content = render_coupling_network(
+                graph_key(logical_coupling), logical_coupling,
+                tuple(sorted(selected_file_types)) if selected_file_types else None
+            )
         
-        if html_file:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
+        if html_content:
             components.html(html_content, height=750)
             
             st.markdown("---")
@@ -536,9 +866,14 @@ with tab5:
                 "Incluir análise de acoplamento",
                 value=True
             )
+            refresh_ai = st.checkbox(
+                "Ignorar relatório em cache",
+                value=False,
+                help="Relatórios dos mesmos dados são reaproveitados do disco; marque para consultar o Gemini de novo"
+            )
         
         if st.button("Analisar com IA", type="primary"):
-            top_files = df.nlargest(top_n, "risk_score").to_dict(orient="records")
+            top_files = df.nlargest(top_n, "risk_score")[AI_COLUMNS].to_dict(orient="records")
             
             data_for_ai = {
                 "repository_path": repo_path,
@@ -552,23 +887,61 @@ with tab5:
             if include_coupling and coupling:
                 data_for_ai["logical_coupling"] = coupling[:5]
             
-            with st.spinner("Consultando Gemini... (pode levar alguns segundos)"):
-                try:
-                    analyzer = AIAnalyzer()
-                    analysis = analyzer.analyze_health(data_for_ai)
-                    
-                    st.markdown("---")
-                    st.markdown("### Relatório de Análise")
-                    st.markdown(analysis)
-                    
-                except Exception as e:
-                    st.error(f"Erro ao consultar a IA: {str(e)}")
-                    st.info(
-                        "Verifique se:\n"
-                        "- A API Key está correta\n"
-                        "- Você tem créditos disponíveis no Google AI Studio\n"
-                        "- Sua conexão com a internet está ativa"
+            st.markdown("---")
+            st.markdown("### Relatório de Análise")
+            report_placeholder = st.empty()
+            report_placeholder.info("Consultando Gemini... as seções aparecem conforme são geradas")
+            try:
+                ai_profiler = Profiler()
+                analyzer = AIAnalyzer(profiler=ai_profiler)
+                for analysis in analyzer.stream_health(data_for_ai, refresh=refresh_ai):
+                    report_placeholder.markdown(analysis)
+                if analyzer.last_from_cache:
+                    st.caption("Relatório recuperado do cache: os dados e o modelo são os mesmos da última consulta.")
+                if analyzer.last_payload_stats:
+                    st.caption(describe_savings(analyzer.last_payload_stats))
+                ai_stages = {stage["stage"]: stage["total"] for stage in ai_profiler.summary()}
+                if "ai.report" in ai_stages:
+                    st.caption(
+                        f"Primeiro trecho em {ai_stages.get('ai.first_token', 0):.1f}s · "
+                        f"relatório completo em {ai_stages['ai.report']:.1f}s"
                     )
+                
+            except Exception as e:
+                report_placeholder.empty()
+                st.error(f"Erro ao consultar a IA: {str(e)}")
+                st.info(
+                    "Verifique se:\n"
+                    "- A API Key está correta\n"
+                    "- Você tem créditos disponíveis no Google AI Studio\n"
+                    "- Sua conexão com a internet está ativa"
+                )
+
+if profile:
+    with st.expander("⏱ Performance"):
+        st.caption(
+            "Tempo gasto em cada etapa da última mineração deste repositório. "
+            "Etapas por arquivo/commit (ex.: paths.resolve) são somadas; as demais são intervalos."
+        )
+        st.dataframe(
+            pd.DataFrame(profile["stages"]),
+            column_config={
+                "stage": st.column_config.TextColumn("Etapa"),
+                "calls": st.column_config.NumberColumn("Chamadas", format="%d"),
+                "total": st.column_config.NumberColumn("Total (s)", format="%.3f"),
+                "mean": st.column_config.NumberColumn("Média (s)", format="%.5f"),
+                "share": st.column_config.ProgressColumn("% do tempo", min_value=0, max_value=1, format="%.2f"),
+            },
+            hide_index=True,
+        )
+        if profile["counters"]:
+            st.caption(" · ".join(f"{name}: {value:,}" for name, value in sorted(profile["counters"].items())))
+        st.download_button(
+            "Baixar trace (Chrome/Perfetto)",
+            data=json.dumps(profile["trace"]),
+            file_name="saude-evolutiva-trace.json",
+            mime="application/json",
+        )
 
 st.markdown("---")
 st.markdown(
@@ -0,0 +1,86 @@
+"""
+Compara o tempo de mineração dos backends de histórico (PyDriller x git log --numstat)
+e confere que os dois produzem os mesmos fatos.
+
+    python -m benchmarks.bench_backends ../caminho/do/repo --commits 500
+    python -m benchmarks.bench_backends ../caminho/do/repo --path src/api
+
+Sem repositório, usa um sintético com arquivos movidos entre pacotes, recortado em `pkg0`:
+renomeações que cruzam o recorte precisam virar remoção/adição nos dois backends.
+"""
+import time
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from src.collector import BACKENDS, GitCollector
+from src.history import HistoryFilter
+
+from .synthetic import HistorySpec, cached_repo
+
+app = typer.Typer()
+console = Console()
+
+MOVES_SPEC = HistorySpec(commits=400, files=60, move_rate=0.1)
+
+
+def _mine(path: str, commits: int, backend: str, history: HistoryFilter):
+    collector = GitCollector(path, limit_commits=commits, use_cache=False, backend=backend, history=history)
+    start = time.perf_counter()
+    facts = list(collector._iter_commit_facts())
+    return time.perf_counter() - start, facts
+
+
+@app.command()
+def run(
+    path: str = typer.Argument(None, help="Caminho local do repositório (sem ele, um sintético com arquivos movidos)"),
+    commits: int = typer.Option(500, help="Quantos commits minerar"),
+    repeat: int = typer.Option(3, min=1, help="Repetições por backend (vale o melhor tempo)"),
+    scope: List[str] = typer.Option(None, "--path", help="Minera só o histórico destes caminhos (pode repetir)")
+):
+    if path is None:
+        path = cached_repo(MOVES_SPEC)
+        scope = scope or ["pkg0"]
+    history = HistoryFilter.build(paths=scope)
+    timings = {}
+    results = {}
+    for backend in BACKENDS:
+        best = None
+        for _ in range(repeat):
+            elapsed, facts = _mine(path, commits, backend, history)
+            best = elapsed if best is None else min(best, elapsed)
+        timings[backend] = best
+        results[backend] = facts
+
+    baseline = timings['pydriller']
+    described = history.describe()
+    table = Table(title=f"Mineração de {len(results['pydriller'])} commits" + (f" ({described})" if described else ""))
+    table.add_column("Backend", style="cyan")
+    table.add_column("Tempo (s)", justify="right")
+    table.add_column("Commits/s", justify="right")
+    table.add_column("Speedup", justify="right", style="green")
+    for backend, elapsed in timings.items():
+        table.add_row(
+            backend,
+            f"{elapsed:.3f}",
+            f"{len(results[backend]) / elapsed:,.0f}" if elapsed else "-",
+            f"{baseline / elapsed:.1f}x" if elapsed else "-"
+        )
+    console.print(table)
+
+    # Os dois backends precisam produzir exatamente os mesmos fatos: commits, caminhos (inclusive o antigo
+    # das renomeações) e linhas por arquivo
+    pydriller, numstat = results['pydriller'], results['numstat']
+    mismatches = [a.sha for a, b in zip(pydriller, numstat) if a != b]
+    if len(pydriller) != len(numstat):
+        console.print(f"[bold red]Quantidade de commits diverge: {len(pydriller)} x {len(numstat)}[/bold red]")
+        raise typer.Exit(code=1)
+    if mismatches:
+        console.print(f"[bold red]{len(mismatches)} commits divergem entre os backends[/bold red] (ex.: {mismatches[0]})")
+        raise typer.Exit(code=1)
+    console.print("[green]Fatos idênticos entre os backends.[/green]")
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,224 @@
+"""
+Mede como o coletor escala com o tamanho do histórico, em repositórios sintéticos.
+
+    python -m benchmarks.bench_scaling --sizes 250,500,1000,2000 --output baseline.json --plot curvas.html
+    python -m benchmarks.bench_scaling --sizes 250,500,1000,2000 --baseline baseline.json
+
+Para cada tamanho, mede o melhor de `--repeat` execuções de collect_metrics,
+get_coupling_analysis, get_logical_coupling e _calc_complexity (todos os arquivos da
+árvore). Com `--baseline`, compara com uma execução anterior e sai com código 1 se
+alguma etapa ficou mais lenta que a tolerância.
+"""
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from src.cache import ComplexityCache
+from src.collector import BACKENDS, GitCollector
+from src.history import run_git
+
+from .synthetic import HistorySpec, cached_repo
+
+app = typer.Typer()
+console = Console()
+
+OPERATIONS = ("collect_metrics", "get_coupling_analysis", "get_logical_coupling", "_calc_complexity")
+
+
+def _measure_once(repo_path: str, commits: int, backend: str):
+    timings = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Cache de complexidade vazio a cada repetição: o lizard entra na medida
+        complexity_cache = ComplexityCache(os.path.join(cache_dir, "complexity.sqlite"))
+        collector = GitCollector(repo_path, limit_commits=commits, use_cache=False, backend=backend,
+                                 complexity_cache=complexity_cache)
+
+        start = time.perf_counter()
+        collector.collect_metrics()
+        timings["collect_metrics"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        collector.get_coupling_analysis(min_shared_commits=3)
+        timings["get_coupling_analysis"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        collector.get_logical_coupling(min_shared_commits=2)
+        timings["get_logical_coupling"] = time.perf_counter() - start
+
+        files = [os.path.join(repo_path, path) for path in run_git(repo_path, "ls-files", "-z").split("\0") if path]
+        start = time.perf_counter()
+        for file_path in files:
+            collector._calc_complexity(file_path)
+        timings["_calc_complexity"] = time.perf_counter() - start
+
+        complexity_cache.close()
+    return timings
+
+
+def _measure(repo_path: str, commits: int, backend: str, repeat: int):
+    best = {}
+    for _ in range(repeat):
+        # As mensagens de progresso do coletor atrapalhariam a tabela final
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = _measure_once(repo_path, commits, backend)
+        for operation, elapsed in timings.items():
+            best[operation] = min(elapsed, best.get(operation, elapsed))
+    return {operation: round(best[operation], 6) for operation in OPERATIONS}
+
+
+def _environment():
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "git": git_version,
+    }
+
+
+def _exponents(results):
+    """Expoente de crescimento (inclinação log-log) entre o menor e o maior tamanho: ~1 é linear."""
+    sizes = sorted(results, key=int)
+    if len(sizes) < 2:
+        return {}
+    low, high = sizes[0], sizes[-1]
+    ratio = math.log(int(high) / int(low))
+    return {
+        operation: round(math.log(results[high][operation] / results[low][operation]) / ratio, 2)
+        for operation in OPERATIONS
+        if results[low][operation] > 0 and results[high][operation] > 0
+    }
+
+
+def _print_curves(results, exponents):
+    table = Table(title="Tempo por etapa (s, melhor execução)")
+    table.add_column("Commits", justify="right", style="cyan")
+    for operation in OPERATIONS:
+        table.add_column(operation, justify="right")
+    for size in sorted(results, key=int):
+        table.add_row(size, *(f"{results[size][operation]:.4f}" for operation in OPERATIONS))
+    if exponents:
+        table.add_row("expoente", *(str(exponents.get(operation, "-")) for operation in OPERATIONS), style="bold")
+    console.print(table)
+
+
+def _plot_curves(results, path: str):
+    """Curvas tempo x commits em HTML autocontido (o plotly.js vai embutido, funciona offline)."""
+    import plotly.graph_objects as go
+
+    sizes = sorted(results, key=int)
+    fig = go.Figure([
+        go.Scatter(x=[int(size) for size in sizes], y=[results[size][operation] for size in sizes],
+                   mode="lines+markers", name=operation)
+        for operation in OPERATIONS
+    ])
+    fig.update_layout(title="Escalabilidade do coletor", xaxis_title="Commits", yaxis_title="Tempo (s)",
+                      xaxis_type="log", yaxis_type="log")
+    fig.write_html(path, include_plotlyjs=True)
+
+
+def _compare(results, baseline, tolerance: float, min_delta: float):
+    """
+    Etapas mais lentas que o baseline além da tolerância (tamanhos presentes nos dois).
+    Diferenças abaixo de `min_delta` segundos são ruído de medição e não contam.
+    """
+    table = Table(title=f"Comparação com o baseline (tolerância {tolerance:.0%})")
+    table.add_column("Commits", justify="right", style="cyan")
+    table.add_column("Etapa")
+    table.add_column("Baseline (s)", justify="right")
+    table.add_column("Atual (s)", justify="right")
+    table.add_column("Variação", justify="right")
+    regressions = []
+    for size in sorted(set(results) & set(baseline["results"]), key=int):
+        for operation in OPERATIONS:
+            before = baseline["results"][size].get(operation)
+            after = results[size][operation]
+            if not before:
+                continue
+            change = after / before - 1
+            regressed = change > tolerance and after - before > min_delta
+            if regressed:
+                regressions.append((size, operation, change))
+            table.add_row(
+                size, operation, f"{before:.4f}", f"{after:.4f}",
+                f"[{'red' if regressed else 'green'}]{change:+.0%}[/]"
+            )
+    console.print(table)
+    return regressions
+
+
+@app.command()
+def run(
+    sizes: str = typer.Option("250,500,1000,2000", help="Tamanhos do histórico (commits), separados por vírgula"),
+    files: int = typer.Option(200, min=1, help="Arquivos no repositório sintético"),
+    files_per_commit: int = typer.Option(5, min=1, help="Arquivos alterados por commit"),
+    authors: int = typer.Option(8, min=1, help="Quantidade de autores"),
+    rename_rate: float = typer.Option(0.02, min=0, max=1, help="Probabilidade de um commit renomear um arquivo"),
+    seed: int = typer.Option(42, help="Semente do gerador"),
+    backend: str = typer.Option("numstat", help="Coletor de histórico: 'pydriller' ou 'numstat'"),
+    repeat: int = typer.Option(3, min=1, help="Repetições por tamanho (vale o melhor tempo)"),
+    output: str = typer.Option(None, help="Salva os resultados em JSON (serve de baseline para execuções futuras)"),
+    plot: str = typer.Option(None, help="Salva as curvas de escalabilidade num HTML"),
+    baseline: str = typer.Option(None, help="JSON de uma execução anterior para comparar"),
+    tolerance: float = typer.Option(0.2, min=0, help="Piora relativa aceita antes de acusar regressão"),
+    min_delta: float = typer.Option(0.05, min=0, help="Piora absoluta mínima (s) para acusar regressão"),
+    repos_dir: str = typer.Option(None, help="Onde guardar os repositórios gerados (padrão: cache do projeto)")
+):
+    if backend not in BACKENDS:
+        console.print(f"[bold red]Erro:[/bold red] Backend '{backend}' inválido. Opções: {', '.join(BACKENDS)}")
+        raise typer.Exit(code=1)
+
+    sizes = sorted({int(size) for size in sizes.split(",") if size.strip()})
+    results = {}
+    for size in sizes:
+        spec = HistorySpec(size, files, files_per_commit, authors, rename_rate, seed)
+        with console.status(f"[bold green]Gerando histórico sintético com {size} commits..."):
+            repo_path = cached_repo(spec, repos_dir)
+        with console.status(f"[bold green]Medindo {size} commits..."):
+            results[str(size)] = _measure(repo_path, size, backend, repeat)
+
+    exponents = _exponents(results)
+    _print_curves(results, exponents)
+
+    report = {
+        "params": {
+            "files": files, "files_per_commit": files_per_commit, "authors": authors,
+            "rename_rate": rename_rate, "seed": seed, "backend": backend, "repeat": repeat,
+        },
+        "environment": _environment(),
+        "results": results,
+        "exponents": exponents,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        console.print(f"[dim]Resultados salvos em {output}[/dim]")
+
+    if plot:
+        _plot_curves(results, plot)
+        console.print(f"[dim]Curvas salvas em {plot}[/dim]")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("params") != report["params"]:
+            console.print("[yellow]Aviso: parâmetros diferentes do baseline; a comparação pode não ser justa.[/yellow]")
+        regressions = _compare(results, previous, tolerance, min_delta)
+        if regressions:
+            console.print(f"[bold red]{len(regressions)} etapas mais lentas que o baseline.[/bold red]")
+            raise typer.Exit(code=1)
+        console.print("[green]Nenhuma regressão em relação ao baseline.[/green]")
+
+
+if __name__ == "__main__":
+    app()
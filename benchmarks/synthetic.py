@@ -0,0 +1,157 @@
+"""
+Gera repositórios Git sintéticos e reproduzíveis para benchmarks, sem rede.
+
+O histórico inteiro é escrito num único `git fast-import`, então milhares de commits
+levam segundos. Mesmos parâmetros e semente produzem os mesmos SHAs.
+
+    python -m benchmarks.synthetic /tmp/repo-sintetico --commits 2000 --files 300
+"""
+import hashlib
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+from typing import NamedTuple
+
+import typer
+
+from src.cache import default_cache_dir
+
+app = typer.Typer()
+
+BASE_TIMESTAMP = 1_600_000_000
+
+
+class HistorySpec(NamedTuple):
+    commits: int = 1000
+    files: int = 200
+    files_per_commit: int = 5
+    authors: int = 8
+    rename_rate: float = 0.02
+    seed: int = 42
+    # Probabilidade de um commit mover um arquivo, sem alterá-lo, para outro pacote (renomeação entre pastas)
+    move_rate: float = 0.0
+
+    @property
+    def slug(self) -> str:
+        digest = hashlib.sha1(json.dumps(self._asdict(), sort_keys=True).encode()).hexdigest()[:10]
+        return f"c{self.commits}-f{self.files}-{digest}"
+
+
+def _source(file_id: int, version: int) -> bytes:
+    """Conteúdo Python determinístico; o número de funções e de ramos varia com a versão."""
+    rng = random.Random(file_id * 1_000_003 + version)
+    lines = [f'"""Módulo sintético {file_id}, versão {version}."""', ""]
+    for func in range(3 + version % 30):
+        lines.append(f"def func_{func}(x):")
+        for branch in range(rng.randint(0, 4)):
+            lines.append(f"    if x > {branch * 10 + rng.randint(0, 9)}:")
+            lines.append(f"        x -= {rng.randint(1, 5)}")
+        lines.append("    return x")
+        lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _data(payload: bytes) -> bytes:
+    return b"data %d\n" % len(payload) + payload + b"\n"
+
+
+def _fast_import_stream(spec: HistorySpec):
+    """Comandos do `git fast-import`, um commit por vez."""
+    rng = random.Random(spec.seed)
+    paths = {file_id: f"pkg{file_id % 10}/mod{file_id}.py" for file_id in range(spec.files)}
+    versions = dict.fromkeys(paths, 0)
+    # Distribuição de Zipf: poucos arquivos concentram a maior parte das mudanças, como em projetos reais
+    file_ids = range(spec.files)
+    file_weights = list(itertools.accumulate(1 / (rank + 1) for rank in file_ids))
+    authors = [f"Autor {i}" for i in range(spec.authors)]
+    author_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(spec.authors)))
+
+    for index in range(spec.commits):
+        author = rng.choices(authors, cum_weights=author_weights)[0]
+        email = author.lower().replace(" ", ".") + "@example.com"
+        when = BASE_TIMESTAMP + index * 3600
+        ops = []
+
+        if index == 0:
+            touched = list(paths)
+        else:
+            touched = set()
+            while len(touched) < min(spec.files_per_commit, spec.files):
+                touched.add(rng.choices(file_ids, cum_weights=file_weights)[0])
+            touched = sorted(touched)
+            if rng.random() < spec.rename_rate:
+                file_id = rng.choice(touched)
+                new_path = f"{os.path.splitext(paths[file_id])[0]}_r{index}.py"
+                ops.append(f'R "{paths[file_id]}" "{new_path}"\n'.encode())
+                paths[file_id] = new_path
+            if spec.move_rate and len(touched) > 1 and rng.random() < spec.move_rate:
+                file_id = touched.pop(rng.randrange(len(touched)))
+                package = (int(paths[file_id][3]) + 1) % 10
+                new_path = f"pkg{package}/{os.path.basename(paths[file_id])[:-3]}_m{index}.py"
+                ops.append(f'R "{paths[file_id]}" "{new_path}"\n'.encode())
+                paths[file_id] = new_path
+
+        for file_id in touched:
+            versions[file_id] += 1
+            ops.append(f"M 100644 inline {paths[file_id]}\n".encode() + _data(_source(file_id, versions[file_id])))
+
+        header = (
+            f"commit refs/heads/main\nmark :{index + 1}\n"
+            f"author {author} <{email}> {when} +0000\n"
+            f"committer {author} <{email}> {when} +0000\n"
+        ).encode()
+        message = _data(f"Commit sintético {index}".encode("utf-8"))
+        parent = f"from :{index}\n".encode() if index else b""
+        yield header + message + parent + b"".join(ops) + b"\n"
+
+
+def build_repo(path: str, spec: HistorySpec) -> str:
+    """Cria o repositório em `path` (apagando o que houver) e faz checkout do último commit."""
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    subprocess.run(["git", "init", "-q", path], check=True)
+    process = subprocess.Popen(["git", "-C", path, "fast-import", "--quiet"], stdin=subprocess.PIPE)
+    for chunk in _fast_import_stream(spec):
+        process.stdin.write(chunk)
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"git fast-import falhou em {path}")
+    subprocess.run(["git", "-C", path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+    subprocess.run(["git", "-C", path, "reset", "-q", "--hard"], check=True)
+    return path
+
+
+def cached_repo(spec: HistorySpec, root: str = None) -> str:
+    """Repositório para `spec`, gerado uma única vez e reaproveitado entre execuções."""
+    root = root or os.path.join(default_cache_dir(), "synthetic")
+    path = os.path.join(root, spec.slug)
+    marker = os.path.join(path, ".git", "synthetic-spec.json")
+    if not os.path.exists(marker):
+        build_repo(path, spec)
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(spec._asdict(), f)
+    return path
+
+
+@app.command()
+def generate(
+    path: str = typer.Argument(..., help="Pasta do repositório a criar (é apagada se existir)"),
+    commits: int = typer.Option(1000, min=1, help="Quantidade de commits"),
+    files: int = typer.Option(200, min=1, help="Quantidade de arquivos"),
+    files_per_commit: int = typer.Option(5, min=1, help="Arquivos alterados por commit"),
+    authors: int = typer.Option(8, min=1, help="Quantidade de autores"),
+    rename_rate: float = typer.Option(0.02, min=0, max=1, help="Probabilidade de um commit renomear um arquivo"),
+    seed: int = typer.Option(42, help="Semente do gerador"),
+    move_rate: float = typer.Option(0.0, min=0, max=1, help="Probabilidade de um commit mover um arquivo para outro pacote")
+):
+    spec = HistorySpec(commits, files, files_per_commit, authors, rename_rate, seed, move_rate)
+    build_repo(path, spec)
+    typer.echo(f"Repositório sintético criado em {path} ({commits} commits, {files} arquivos)")
+
+
+if __name__ == "__main__":
+    app()
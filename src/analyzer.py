@@ -1,53 +1,258 @@
 import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
 from .config import Config
+from .cache import ReportCache
+from .payload import encode_payload
+from .profiling import DISABLED, Profiler
+import asyncio
+import hashlib
 import json
+import queue
+import random
+import threading
+import time
 
-class AIAnalyzer:
-    def __init__(self):
-        self.model = genai.GenerativeModel(
-            model_name=Config.GEMINI_MODEL,
-            generation_config={
-                "temperature": 0.3,
-                "top_p": 0.95,
-                "top_k": 64,
-                "max_output_tokens": 8192,
-            },
-            system_instruction="Você é um Staff Software Engineer sênior focado em manutenibilidade, dívida técnica e arquitetura de software."
-        )
+# A chave do .env vale para o SDK assim que a camada de IA é carregada (só quem usa IA importa este módulo)
+if Config.GOOGLE_API_KEY:
+    genai.configure(api_key=Config.GOOGLE_API_KEY)
+
+GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 8192,
+}
+
+SYSTEM_INSTRUCTION = "Você é um Staff Software Engineer sênior focado em manutenibilidade, dívida técnica e arquitetura de software."
 
-    def analyze_health(self, metrics_data):
-        context = json.dumps(metrics_data, indent=2)
-        
-        prompt = f"""
+# Incrementar sempre que o texto do prompt mudar: relatórios antigos deixam de ser reaproveitados
+PROMPT_VERSION = 4
+
+# Seções do relatório, geradas em paralelo e exibidas nesta ordem
+SECTIONS = (
+    ("Diagnóstico de Saúde", "Resumo executivo do estado atual."),
+    ("Análise de Risco (Top Hotspots)", "Destaque 2 ou 3 arquivos mais críticos e explique o porquê baseado nos números."),
+    ("Risco Humano (Silos de Conhecimento)", "Identifique se há dependência excessiva de desenvolvedores específicos."),
+    ("Plano de Ação Imediato", '3 tarefas técnicas práticas (ex: "Refatorar classe X", "Criar testes para Y", "Quebrar módulo Z").'),
+)
+
+PROMPT_TEMPLATE = """
         Analise os seguintes dados métricos extraídos de um repositório Git.
         Estes são os arquivos com maior risco (Hotspots) baseados em Churn x Complexidade.
 
         [DADOS DO REPOSITÓRIO]
+        Cada tabela tem o nome entre colchetes seguido das colunas separadas por "|"; cada linha abaixo é um registro.
         {context}
-        
+
         [SEUS CRITÉRIOS DE ANÁLISE]
         1. Hotspots: Arquivos com muita alteração (churn) e alta complexidade são candidatos a refatoração.
-        2. Bus Factor: Se 'top_authors' mostrar apenas 1 pessoa com >80% das mudanças, é um risco.
+        2. Bus Factor: Se 'top_author_share' passar de 0.8 (o autor principal, 'top_author', fez mais de 80% das mudanças do arquivo), é um risco.
         3. Acoplamento: Arquivos que mudam sempre juntos ou têm churn constante indicam violação de SRP (Single Responsibility Principle).
 
         [TAREFA]
-        Gere um relatório técnico em Markdown com as seções:
-        
-        ## Diagnóstico de Saúde
-        Resumo executivo do estado atual.
-        
-        ## Análise de Risco (Top Hotspots)
-        Destaque 2 ou 3 arquivos mais críticos e explique o porquê baseado nos números.
-        
-        ## Risco Humano (Silos de Conhecimento)
-        Identifique se há dependência excessiva de desenvolvedores específicos.
-        
-        ## Plano de Ação Imediato
-        3 tarefas técnicas práticas (ex: "Refatorar classe X", "Criar testes para Y", "Quebrar módulo Z").
+        Você está escrevendo apenas a seção "{title}" de um relatório técnico em Markdown.
+        {instruction}
+        Responda somente com o conteúdo desta seção, sem repetir o título e sem outras seções.
         """
 
+# Falhas transitórias da API: vale tentar de novo, com espera crescente
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop():
+    """
+    Loop asyncio único, rodando numa thread de fundo. O cliente assíncrono do Gemini fica
+    preso ao loop em que foi criado, então todas as chamadas passam sempre pelo mesmo.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-loop", daemon=True).start()
+    return _loop
+
+
+class AIAnalyzer:
+    """
+    Gera o relatório de saúde com o Gemini. As seções são pedidas em paralelo (até
+    `max_concurrency` ao mesmo tempo) e chegam em streaming, trecho a trecho.
+    Relatórios completos ficam em cache no disco, indexados pelo pedido, então repetir a
+    análise dos mesmos dados não consome cota.
+    `model` aceita qualquer objeto com `generate_content_async(prompt, stream=True)` que
+    devolva um iterável assíncrono de trechos com `.text` (útil para testes sem rede).
+    """
+
+    def __init__(self, model=None, use_cache: bool = True, cache: ReportCache = None,
+                 max_concurrency: int = None, max_retries: int = 3, backoff: float = 1.0,
+                 token_budget: int = None, profiler: Profiler = None):
+        self.model = model or genai.GenerativeModel(
+            model_name=Config.GEMINI_MODEL,
+            generation_config=GENERATION_CONFIG,
+            system_instruction=SYSTEM_INSTRUCTION
+        )
+        self.model_name = getattr(self.model, "model_name", Config.GEMINI_MODEL)
+        self.cache = cache
+        if self.cache is None and use_cache and Config.AI_CACHE_TTL > 0:
+            self.cache = ReportCache(ttl=Config.AI_CACHE_TTL)
+        self.max_concurrency = max(1, max_concurrency or Config.AI_MAX_CONCURRENCY)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.token_budget = Config.AI_TOKEN_BUDGET if token_budget is None else token_budget
+        self.profiler = profiler or DISABLED
+        self.last_from_cache = False
+        self.last_payload_stats = None
+        self.last_failed = False
+
+    def cache_key(self, metrics_data) -> str:
+        """Hash do pedido: dados normalizados (chaves ordenadas), modelo, configuração e versão do prompt."""
+        request = {
+            "metrics": metrics_data,
+            "model": self.model_name,
+            "generation_config": GENERATION_CONFIG,
+            "system_instruction": SYSTEM_INSTRUCTION,
+            "prompt_version": PROMPT_VERSION,
+            "token_budget": self.token_budget,
+        }
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _stream_section(self, index, prompt, limiter, events):
+        """Gera uma seção, repassando cada trecho para `events`. Retorna False se a seção falhou."""
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    emitted = False
+                    try:
+                        response = await self.model.generate_content_async(prompt, stream=True)
+                        async for chunk in response:
+                            text = chunk.text
+                            if text:
+                                emitted = True
+                                await events.put((index, text))
+                        return True
+                    except Exception as e:
+                        # Depois do primeiro trecho, repetir duplicaria texto já exibido
+                        if emitted or attempt == self.max_retries or not isinstance(e, RETRYABLE_ERRORS):
+                            await events.put((index, f"\n\nErro ao consultar o Gemini: {str(e)}"))
+                            return False
+                        self.profiler.count("ai.retries")
+                        await asyncio.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            finally:
+                self.profiler.record(f"ai.section.{index}", started, time.perf_counter() - started)
+
+    async def astream_health(self, metrics_data):
+        """
+        Gerador assíncrono de (índice da seção, trecho de texto), na ordem de chegada.
+        Todas as seções começam juntas; o limitador só deixa `max_concurrency` em andamento.
+        """
+        started = time.perf_counter()
+        with self.profiler.span("ai.encode_payload"):
+            context, self.last_payload_stats = encode_payload(metrics_data, self.token_budget)
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        events = asyncio.Queue()
+        tasks = [
+            asyncio.ensure_future(self._stream_section(
+                index, PROMPT_TEMPLATE.format(context=context, title=title, instruction=instruction),
+                limiter, events
+            ))
+            for index, (title, instruction) in enumerate(SECTIONS)
+        ]
+        finished = asyncio.ensure_future(asyncio.gather(*tasks))
+        self.last_failed = False
+        getter = None
+        first_token = True
+        try:
+            while not (finished.done() and events.empty()):
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({getter, finished}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    if first_token:
+                        # Tempo até o primeiro trecho: o que o usuário sente esperando
+                        self.profiler.record("ai.first_token", started, time.perf_counter() - started)
+                        first_token = False
+                    yield getter.result()
+                else:
+                    getter.cancel()
+            self.last_failed = not all(finished.result())
+        finally:
+            # Cancelar o gather cancela as seções que ainda estiverem em andamento
+            if getter is not None:
+                getter.cancel()
+            finished.cancel()
+            finished.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    @staticmethod
+    def render(sections) -> str:
+        """Markdown do relatório com as seções que já têm conteúdo, sempre na ordem de SECTIONS."""
+        return "\n\n".join(
+            f"## {title}\n{text.strip()}"
+            for (title, _), text in zip(SECTIONS, sections)
+            if text
+        )
+
+    def stream_health(self, metrics_data, refresh: bool = False):
+        """
+        Gerador síncrono para CLI e Streamlit: devolve o relatório parcial (Markdown) a cada
+        trecho recebido. Com `refresh`, ignora o cache e consulta o modelo de novo.
+        """
+        self.last_from_cache = False
+        self.last_payload_stats = None
+        key = self.cache_key(metrics_data) if self.cache else None
+        if key and not refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.last_from_cache = True
+                self.profiler.count("ai.cache_hits")
+                yield cached
+                return
+
+        events = queue.Queue()
+
+        async def produce():
+            try:
+                async for event in self.astream_health(metrics_data):
+                    events.put(event)
+            finally:
+                events.put(None)
+
+        started = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(produce(), _event_loop())
+        sections = [""] * len(SECTIONS)
+        completed = False
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Erro ao consultar o Gemini: {str(e)}"
\ No newline at end of file
+            while True:
+                event = events.get()
+                if event is None:
+                    completed = True
+                    break
+                index, text = event
+                sections[index] += text
+                yield self.render(sections)
+        finally:
+            # Quem consome parou antes do fim: cancela as seções ainda em andamento
+            if not completed:
+                future.cancel()
+
+        future.result()
+        self.profiler.record("ai.report", started, time.perf_counter() - started)
+        # Erros não vão para o cache: a próxima tentativa consulta o modelo de novo
+        if key and not self.last_failed:
+            self.cache.put(key, self.render(sections))
+
+    def analyze_health(self, metrics_data, refresh: bool = False):
+        """Relatório completo em Markdown (versão bloqueante do stream_health)."""
+        report = ""
+        for report in self.stream_health(metrics_data, refresh=refresh):
+            pass
+        return report
@@ -0,0 +1,143 @@
+import contextlib
+import io
+import os
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .collector import GitCollector
+from .history import run_git
+from .profiling import Profiler
+
+
+def read_manifest(manifest_path: str):
+    """
+    Caminhos de repositório listados no manifesto, um por linha. Linhas vazias e
+    comentários (#) são ignorados; caminhos relativos partem da pasta do manifesto.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    paths = []
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(os.path.normpath(os.path.join(base_dir, os.path.expanduser(line))))
+    return paths
+
+
+def scan_repository(path: str, commits: int = 100, backend: str = "pydriller", use_cache: bool = True):
+    """
+    Analisa um repositório e devolve um registro serializável em JSON, com os tempos de
+    cada etapa. Qualquer falha vira um registro com ok=False, sem derrubar o lote.
+    """
+    start = time.perf_counter()
+    record = {"repo": path, "ok": False}
+    # As mensagens de progresso do coletor sujariam a saída JSONL
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            if not os.path.isdir(path):
+                raise FileNotFoundError(f"Caminho '{path}' não encontrado")
+            try:
+                run_git(path, "rev-parse", "--git-dir")
+            except subprocess.CalledProcessError as e:
+                raise ValueError(f"'{path}' não é um repositório Git") from e
+
+            profiler = Profiler()
+            collector = GitCollector(path, limit_commits=commits, use_cache=use_cache, backend=backend, profiler=profiler)
+            for snapshot in collector.iter_metrics(snapshot_every=0):
+                pass
+            finished = time.perf_counter()
+        # O acoplamento é somado durante a mineração e ranqueado no snapshot final (o MinHash, se houver, fica dentro do ranking)
+        coupled = profiler.totals["coupling.aggregate"] + profiler.totals["coupling.top_pairs"]
+
+        record.update({
+            "ok": True,
+            "commits_analyzed": collector.total_commits_analyzed,
+            "files_touched": len(collector.file_metrics),
+            "truck_factor": collector.get_truck_factor(),
+            "hotspots": snapshot["hotspots"],
+            "coupling": snapshot["coupling"],
+            "timings": {
+                "collect": round(finished - start - coupled, 3),
+                "coupling": round(coupled, 3),
+                "total": round(finished - start, 3),
+            },
+        })
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    if not record["ok"]:
+        record["timings"] = {"total": round(time.perf_counter() - start, 3)}
+        record["log"] = log.getvalue()[-2000:]
+    return record
+
+
+def _failure(path: str, error: Exception):
+    return {"repo": path, "ok": False, "error": f"{type(error).__name__}: {error}"}
+
+
+def _iter_isolated(paths, options):
+    """
+    Analisa cada repositório num processo só dele, todos ao mesmo tempo. Se um processo
+    morre, o BrokenProcessPool atinge apenas o pool daquele repositório.
+    """
+    futures = {}
+    try:
+        for path in paths:
+            executor = ProcessPoolExecutor(max_workers=1)
+            futures[executor.submit(scan_repository, path, **options)] = (path, executor)
+        for future in as_completed(futures):
+            path, executor = futures[future]
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                yield _failure(path, BrokenProcessPool("o processo que analisava o repositório morreu (falta de memória ou sinal)"))
+            except Exception as e:
+                yield _failure(path, e)
+            executor.shutdown(wait=True)
+    finally:
+        for _, executor in futures.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_batch_scan(paths, workers: int = None, **options):
+    """
+    Analisa vários repositórios num pool de processos, devolvendo cada registro assim que
+    o repositório termina (ordem de conclusão, não a do manifesto). Cada processo importa
+    as dependências uma vez e atende vários repositórios.
+
+    Se um processo morre (falta de memória, sinal), o pool inteiro quebra e todos os
+    repositórios em andamento nele falham juntos, sem dizer qual foi o culpado. Por isso
+    só `workers` repositórios ficam no pool por vez: quando ele quebra, os que estavam em
+    andamento rodam de novo, cada um em seu próprio processo (só o culpado falha), e os
+    que ainda não tinham começado seguem num pool novo.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = list(reversed(paths))
+    while pending:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+        running = {}
+        broken = False
+        try:
+            while (pending or running) and not broken:
+                while pending and len(running) < workers:
+                    path = pending.pop()
+                    running[executor.submit(scan_repository, path, **options)] = path
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        record = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        continue
+                    except Exception as e:
+                        record = _failure(running[future], e)
+                    del running[future]
+                    yield record
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if running:
+            yield from _iter_isolated(list(running.values()), options)
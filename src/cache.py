@@ -0,0 +1,218 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List
+
+from .history import CommitFacts, FileChange
+
+# 2: caminhos de binários criados/removidos corrigidos no backend PyDriller
+SCHEMA_VERSION = 2
+
+
+def default_cache_dir() -> str:
+    return os.getenv(
+        "SAUDE_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "saude-evolutiva-ia")
+    )
+
+
+def _connect(db_path: str, default_name: str):
+    if db_path is None:
+        cache_dir = default_cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+        db_path = os.path.join(cache_dir, default_name)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return db_path, conn
+
+
+class MiningCache:
+    """
+    Armazena em SQLite os fatos de cada commit (churn, autor, arquivos), indexados por SHA.
+    Um SHA identifica o conteúdo do commit, então o cache nunca precisa ser invalidado.
+    """
+
+    def __init__(self, db_path: str = None, scope: str = ""):
+        # Fatos recortados por caminho (`scope`) não valem para outro recorte: cada um tem seu arquivo
+        name = f"commits-{hashlib.sha1(scope.encode()).hexdigest()[:16]}.sqlite" if scope else "commits.sqlite"
+        self.db_path, self.conn = _connect(db_path, name)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.executescript("""
+                DROP TABLE IF EXISTS file_changes;
+                DROP TABLE IF EXISTS commits;
+            """)
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS commits (
+                sha TEXT PRIMARY KEY,
+                author TEXT NOT NULL,
+                timestamp INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS file_changes (
+                sha TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                old_path TEXT,
+                new_path TEXT,
+                added INTEGER NOT NULL,
+                deleted INTEGER NOT NULL,
+                PRIMARY KEY (sha, seq)
+            );
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+        self.conn.commit()
+
+    def load(self, shas: Iterable[str]) -> Dict[str, CommitFacts]:
+        """Retorna os fatos já minerados para os SHAs pedidos (os ausentes ficam de fora)."""
+        shas = list(shas)
+        found = {}
+        # SQLite limita a quantidade de parâmetros por consulta
+        for i in range(0, len(shas), 500):
+            chunk = shas[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            headers = {
+                sha: (author, timestamp)
+                for sha, author, timestamp in self.conn.execute(
+                    f"SELECT sha, author, timestamp FROM commits WHERE sha IN ({marks})", chunk
+                )
+            }
+            files = {sha: [] for sha in headers}
+            for sha, filename, old_path, new_path, added, deleted in self.conn.execute(
+                f"SELECT sha, filename, old_path, new_path, added, deleted FROM file_changes "
+                f"WHERE sha IN ({marks}) ORDER BY sha, seq", chunk
+            ):
+                files[sha].append(FileChange(filename, old_path, new_path, added, deleted))
+            for sha, (author, timestamp) in headers.items():
+                found[sha] = CommitFacts(sha, author, timestamp, tuple(files[sha]))
+        return found
+
+    def store(self, facts_list: List[CommitFacts]):
+        with self.conn:
+            for facts in facts_list:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO commits (sha, author, timestamp) VALUES (?, ?, ?)",
+                    (facts.sha, facts.author, facts.timestamp)
+                )
+                self.conn.execute("DELETE FROM file_changes WHERE sha = ?", (facts.sha,))
+                self.conn.executemany(
+                    "INSERT INTO file_changes (sha, seq, filename, old_path, new_path, added, deleted) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(facts.sha, seq, *change) for seq, change in enumerate(facts.files)]
+                )
+
+    def close(self):
+        self.conn.close()
+
+
+class ComplexityCache:
+    """
+    Complexidade ciclomática indexada pelo conteúdo do arquivo (hash de blob do git + extensão).
+    Arquivo que não mudou nunca é reanalisado. Acima de `max_entries`, descarta os menos usados.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = 200_000):
+        self.db_path, self.conn = _connect(db_path, "complexity.sqlite")
+        self.max_entries = max_entries
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS complexity (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS complexity_last_used ON complexity (last_used);
+        """)
+        self.conn.commit()
+
+    def load(self, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        found = {}
+        now = int(time.time())
+        with self.conn:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT key, value FROM complexity WHERE key IN ({marks})", chunk
+                ))
+                self.conn.execute(
+                    f"UPDATE complexity SET last_used = ? WHERE key IN ({marks})", [now, *chunk]
+                )
+        return found
+
+    def store(self, values: Dict[str, int]):
+        now = int(time.time())
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO complexity (key, value, last_used) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in values.items()]
+            )
+            excess = self.conn.execute("SELECT COUNT(*) FROM complexity").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM complexity WHERE key IN "
+                    "(SELECT key FROM complexity ORDER BY last_used LIMIT ?)", (excess,)
+                )
+
+    def close(self):
+        self.conn.close()
+
+
+class ReportCache:
+    """
+    Relatórios da IA indexados pelo hash do pedido (dados, modelo, configuração e versão do prompt).
+    Entradas mais antigas que `ttl` segundos expiram; acima de `max_entries`, saem as menos usadas.
+    """
+
+    def __init__(self, db_path: str = None, ttl: int = 7 * 24 * 3600, max_entries: int = 500):
+        self.db_path, self.conn = _connect(db_path, "reports.sqlite")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reports (
+                key TEXT PRIMARY KEY,
+                report TEXT NOT NULL,
+                created INTEGER NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reports_last_used ON reports (last_used);
+        """)
+        self.conn.commit()
+
+    def get(self, key: str):
+        """Relatório guardado para `key`, ou None se não existe ou expirou."""
+        now = int(time.time())
+        with self.conn:
+            row = self.conn.execute("SELECT report, created FROM reports WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                return None
+            self.conn.execute("UPDATE reports SET last_used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, report: str):
+        now = int(time.time())
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reports (key, report, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, report, now, now)
+            )
+            self.conn.execute("DELETE FROM reports WHERE created < ?", (now - self.ttl,))
+            excess = self.conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    "DELETE FROM reports WHERE key IN "
+                    "(SELECT key FROM reports ORDER BY last_used LIMIT ?)", (excess,)
+                )
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM reports")
+
+    def close(self):
+        self.conn.close()
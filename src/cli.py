@@ -1,65 +1,191 @@
 import typer
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.panel import Panel
-from .collector import GitCollector
-from .analyzer import AIAnalyzer
+from rich.live import Live
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+from .profiling import Profiler
+import json
 import os
+import sys
+import time
+from typing import List
 
 app = typer.Typer()
 console = Console()
 
-@app.command()
-def scan(
-    path: str = typer.Argument(..., help="Caminho local do repositório"),
-    commits: int = typer.Option(100, help="Quantos commits analisar para trás"),
-    ai: bool = typer.Option(True, help="Executar análise de IA")
-):
-    if not os.path.exists(path):
-        console.print(f"[bold red]Erro:[/bold red] Caminho '{path}' não encontrado.")
-        raise typer.Exit()
 
-    console.print(f"[bold green]Iniciando análise em: {path}[/bold green]")
-    
-    collector = GitCollector(path, limit_commits=commits)
-    
-    with console.status("[bold green]Minerando histórico (Churn + Complexidade)...[/bold green]"):
-        hotspots = collector.collect_metrics()
-    
-    with console.status("[bold blue]Calculando acoplamento lógico...[/bold blue]"):
-        raw_couplings = collector.get_coupling_analysis(min_shared_commits=3)
+def _sparkline(values):
+    """Mini gráfico em blocos Unicode; commits em que o arquivo não existia viram espaço."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return "-"
+    low, high = min(present), max(present)
+    blocks = "▁▂▃▄▅▆▇█"
+    return "".join(
+        " " if v is None else blocks[int((v - low) / (high - low) * (len(blocks) - 1)) if high > low else 0]
+        for v in values
+    )
 
+
+def _hotspot_table(hotspots, couplings, title, trends=None):
     coupling_map = {}
-    for c in raw_couplings:
+    for c in couplings:
         if c['file_a'] not in coupling_map:
             coupling_map[c['file_a']] = f"{c['file_b']} ({c['strength']})"
         
         if c['file_b'] not in coupling_map:
             coupling_map[c['file_b']] = f"{c['file_a']} ({c['strength']})"
 
-    table = Table(title=f"Top Hotspots (Últimos {commits} commits)")
+    table = Table(title=title)
     table.add_column("Arquivo", style="cyan")
     table.add_column("Churn", style="magenta", justify="right")
     table.add_column("Complexidade", style="yellow", justify="right")
     table.add_column("Risk Score", style="bold red", justify="right")
     table.add_column("Main Author", style="green")
     table.add_column("Acoplamento Principal", style="blue")
+    if trends:
+        table.add_column("Tendência CC", style="yellow")
 
     for h in hotspots:
         main_author = list(h['top_authors'].keys())[0] if h['top_authors'] else "N/A"
         
         coupling_info = coupling_map.get(h['file'], "-")
 
-        table.add_row(
+        row = [
             h['file'], 
             str(h['churn']), 
             str(h['complexity']), 
             str(h['risk_score']),
             main_author,
             coupling_info
+        ]
+        if trends:
+            row.append(_sparkline([p['complexity'] for p in trends.get(h['file'], [])]))
+        table.add_row(*row)
+    return table
+
+
+def _profile_table(profiler):
+    table = Table(title="⏱ Tempo por Etapa")
+    table.add_column("Etapa", style="cyan")
+    table.add_column("Chamadas", justify="right")
+    table.add_column("Total (s)", justify="right", style="bold")
+    table.add_column("Média (ms)", justify="right")
+    table.add_column("% do tempo", justify="right", style="magenta")
+    for stage in profiler.summary():
+        table.add_row(
+            stage['stage'],
+            f"{stage['calls']:,}",
+            f"{stage['total']:.3f}",
+            f"{stage['mean'] * 1000:.3f}",
+            f"{stage['share']:.1%}"
         )
+    if profiler.counters:
+        table.caption = " · ".join(f"{name}: {value:,}" for name, value in sorted(profiler.counters.items()))
+    return table
+
+
+@app.command()
+def scan(
+    path: str = typer.Argument(..., help="Caminho local do repositório"),
+    commits: int = typer.Option(100, help="Quantos commits analisar para trás"),
+    ai: bool = typer.Option(True, help="Executar análise de IA"),
+    cache: bool = typer.Option(True, help="Reaproveitar commits já minerados e relatórios da IA (cache em disco)"),
+    workers: int = typer.Option(1, min=1, help="Processos para minerar commits em paralelo"),
+    backend: str = typer.Option("pydriller", help="Coletor de histórico: 'pydriller' ou 'numstat' (git log --numstat, mais rápido)"),
+    trend: int = typer.Option(0, min=0, help="Amostras de complexidade ao longo da janela por hotspot (0 = desligado)"),
+    profile: bool = typer.Option(False, "--profile", help="Mostrar o tempo gasto em cada etapa da análise"),
+    trace: str = typer.Option(None, help="Exportar as etapas medidas num trace do Chrome (JSON; implica --profile)"),
+    export: str = typer.Option(None, help="Pasta onde gravar as métricas (por arquivo, por commit e pares de acoplamento) para abrir no dashboard sem minerar"),
+    export_format: str = typer.Option("arrow", help="Formato das tabelas exportadas: 'arrow' (IPC, abre mapeado em memória) ou 'parquet' (menor)"),
+    coupling: str = typer.Option("auto", help="Acoplamento: 'exact' (conta pares por commit), 'approx' (MinHash/LSH, para históricos enormes) ou 'auto'"),
+    coupling_error: float = typer.Option(0.05, min=0.02, max=0.5, help="Erro tolerado na estimativa de Jaccard do modo aproximado (memória: arquivos × 1/(4·erro²) × 4 bytes)"),
+    since: str = typer.Option(None, help="Só commits a partir desta data (qualquer formato do git: '2024-01-01', '6 months ago')"),
+    until: str = typer.Option(None, help="Só commits até esta data"),
+    branch: str = typer.Option(None, help="Branch, tag ou SHA a percorrer em vez do HEAD (a complexidade continua vindo da árvore de trabalho)"),
+    first_parent: bool = typer.Option(False, "--first-parent", help="Seguir só o primeiro pai dos merges (a linha principal do branch)"),
+    no_merges: bool = typer.Option(False, "--no-merges", help="Ignorar commits de merge"),
+    scope: List[str] = typer.Option(None, "--path", help="Analisar só commits e arquivos sob este caminho (repetível; ex.: --path services/api)")
+):
+    if not os.path.exists(path):
+        console.print(f"[bold red]Erro:[/bold red] Caminho '{path}' não encontrado.")
+        raise typer.Exit()
+
+    # Dependências pesadas só entram quando a etapa que as usa roda: `--help` e `--no-ai` partem mais rápido
+    from .collector import GitCollector, BACKENDS, COUPLING_MODES, snapshot_interval
+    from .history import HistoryFilter, head_sha
+    from .metrics import BUS_FACTOR_SHARE, calculate_kpis
+
+    if backend not in BACKENDS:
+        console.print(f"[bold red]Erro:[/bold red] Backend '{backend}' inválido. Opções: {', '.join(BACKENDS)}")
+        raise typer.Exit()
+
+    if coupling not in COUPLING_MODES:
+        console.print(f"[bold red]Erro:[/bold red] Modo de acoplamento '{coupling}' inválido. Opções: {', '.join(COUPLING_MODES)}")
+        raise typer.Exit()
+
+    history = HistoryFilter.build(since, until, branch, first_parent, no_merges, scope)
+    if branch and head_sha(path, branch) is None:
+        console.print(f"[bold red]Erro:[/bold red] Referência '{branch}' não encontrada em '{path}'.")
+        raise typer.Exit()
+
+    if export:
+        from .snapshot import FORMATS, write_snapshot
+
+        if export_format not in FORMATS:
+            console.print(f"[bold red]Erro:[/bold red] Formato '{export_format}' inválido. Opções: {', '.join(FORMATS)}")
+            raise typer.Exit()
+
+    console.print(f"[bold green]Iniciando análise em: {path}[/bold green]")
+    if history.describe():
+        console.print(f"[dim]Recorte do histórico: {history.describe()}[/dim]")
+
+    profiler = Profiler(enabled=profile or bool(trace))
+    collector = GitCollector(path, limit_commits=commits, use_cache=cache, workers=workers, backend=backend,
+                             profiler=profiler, coupling_mode=coupling, coupling_error=coupling_error, history=history)
     
+    progress = Progress(
+        SpinnerColumn(),
+        TextColumn("[bold green]Minerando histórico (Churn + Complexidade)..."),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn()
+    )
+    task = progress.add_task("mineração", total=None)
+
+    with profiler.span("cli.mining"), Live(progress, console=console, transient=True, refresh_per_second=8) as live:
+        for snapshot in collector.iter_metrics(snapshot_every=snapshot_interval(commits)):
+            progress.update(task, completed=snapshot['commits_analyzed'], total=snapshot['total_commits'] or None)
+            if not snapshot['done']:
+                with profiler.span("cli.render"):
+                    live.update(Group(
+                        progress,
+                        _hotspot_table(snapshot['hotspots'], snapshot['coupling'], "Top Hotspots (parcial)")
+                    ))
+    hotspots = snapshot['hotspots']
+    raw_couplings = snapshot['coupling']
+
+    trends = None
+    if trend:
+        with profiler.span("cli.trend"), console.status("[bold yellow]Calculando evolução da complexidade...[/bold yellow]"):
+            trends = collector.get_complexity_trend(samples=trend)
+
+    table = _hotspot_table(hotspots, raw_couplings, f"Top Hotspots (Últimos {commits} commits)", trends)
     console.print(table)
+    if collector.file_metrics is not None:
+        total_files, avg_risk, bus_factor = calculate_kpis(collector.file_metrics)
+        console.print(
+            f"[dim]{total_files} arquivos tocados · risco médio {avg_risk:,.0f} · "
+            f"Bus Factor: {bus_factor} arquivos com mais de {BUS_FACTOR_SHARE:.0%} das mudanças de uma pessoa[/dim]"
+        )
+        ownership = collector.get_truck_factor()
+        if ownership and ownership["truck_factor"]:
+            names = ", ".join(ownership["authors"][:5]) + (", ..." if ownership["truck_factor"] > 5 else "")
+            console.print(
+                f"[dim]Truck Factor: {ownership['truck_factor']} ({names}) · sem essas pessoas, "
+                f"{ownership['orphaned_files']} de {ownership['total_files']} arquivos ficam sem ninguém que os conheça[/dim]"
+            )
 
     if raw_couplings:
         console.print("\n")
@@ -77,26 +203,105 @@ def scan(
                 c['strength']
             )
         console.print(coup_table)
+        if collector.coupling_approximate:
+            console.print(
+                f"[dim]Co-alterações estimadas por MinHash (erro de Jaccard ~{coupling_error:.0%}; "
+                f"inclui commits grandes). Use --coupling exact para a contagem exata.[/dim]"
+            )
+
+    if export:
+        with profiler.span("cli.export"), console.status("[bold yellow]Gravando snapshot das métricas...[/bold yellow]"):
+            manifest = write_snapshot(collector, export, export_format, trends)
+        rows = ", ".join(f"{count:,} {name}" for name, count in manifest["rows"].items())
+        console.print(f"[dim]Snapshot salvo em {export} ({rows}). Abra no dashboard em 'Snapshot salvo'.[/dim]")
 
     if ai and hotspots:
         console.print("\n[bold purple]Consultando a IA para diagnóstico...[/bold purple]")
-        
-        analyzer = AIAnalyzer()
+        from .analyzer import AIAnalyzer
+        from .payload import describe_savings
+
+        analyzer = AIAnalyzer(use_cache=cache, profiler=profiler)
         
         context_data = {
             "hotspots": hotspots,
             "logical_coupling": raw_couplings[:5]
         }
         
-        report_input = str(context_data) 
-        
-        report = analyzer.analyze_health(report_input)
-        
-        console.print(Panel(report, title="Relatório de Saúde Evolutiva", border_style="green"))
+        report = ""
+        with profiler.span("cli.ai"), Live(console=console, refresh_per_second=8, vertical_overflow="visible") as live:
+            for report in analyzer.stream_health(context_data):
+                live.update(Panel(report, title="Relatório de Saúde Evolutiva", border_style="green"))
+        if analyzer.last_from_cache:
+            console.print("[dim]Relatório recuperado do cache (mesmos dados e modelo). Use --no-cache para consultar a IA de novo.[/dim]")
+        if analyzer.last_payload_stats:
+            console.print(f"[dim]{describe_savings(analyzer.last_payload_stats)}[/dim]")
         
         with open("HEALTH_REPORT.md", "w", encoding="utf-8", newline="\n") as f:
             f.write(report)
         console.print("\n[dim]Relatório salvo em HEALTH_REPORT.md[/dim]")
 
+    if profiler.enabled:
+        console.print(_profile_table(profiler))
+    if trace:
+        profiler.export_chrome_trace(trace)
+        console.print(f"[dim]Trace salvo em {trace} (abra em chrome://tracing ou ui.perfetto.dev)[/dim]")
+
+@app.command("scan-many")
+def scan_many(
+    manifest: str = typer.Argument(..., help="Arquivo com um caminho de repositório por linha (# para comentários)"),
+    commits: int = typer.Option(100, help="Quantos commits analisar para trás em cada repositório"),
+    workers: int = typer.Option(0, min=0, help="Processos no pool (0 = um por CPU)"),
+    backend: str = typer.Option("numstat", help="Coletor de histórico: 'pydriller' ou 'numstat' (git log --numstat, mais rápido)"),
+    cache: bool = typer.Option(True, help="Reaproveitar commits já minerados (cache em disco)"),
+    output: str = typer.Option("-", "--output", "-o", help="Arquivo JSONL de saída ('-' = saída padrão)")
+):
+    """Analisa vários repositórios num pool de processos, gravando um registro JSON por linha."""
+    # Progresso vai para stderr: stdout pode ser a própria saída JSONL
+    err_console = Console(stderr=True)
+
+    if not os.path.isfile(manifest):
+        err_console.print(f"[bold red]Erro:[/bold red] Manifesto '{manifest}' não encontrado.")
+        raise typer.Exit(code=1)
+
+    from .batch import iter_batch_scan, read_manifest
+    from .collector import BACKENDS
+
+    if backend not in BACKENDS:
+        err_console.print(f"[bold red]Erro:[/bold red] Backend '{backend}' inválido. Opções: {', '.join(BACKENDS)}")
+        raise typer.Exit(code=1)
+
+    paths = read_manifest(manifest)
+    start = time.perf_counter()
+    failures = 0
+    out = sys.stdout if output == "-" else open(output, "w", encoding="utf-8", newline="\n")
+    progress = Progress(
+        SpinnerColumn(),
+        TextColumn("[bold green]Analisando repositórios..."),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=err_console
+    )
+    try:
+        with progress:
+            task = progress.add_task("lote", total=len(paths))
+            for record in iter_batch_scan(paths, workers=workers or None, commits=commits, backend=backend, use_cache=cache):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if not record["ok"]:
+                    failures += 1
+                    progress.console.print(f"[red]Falhou:[/red] {record['repo']} ({record['error']})")
+                progress.advance(task)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    err_console.print(
+        f"[bold]{len(paths) - failures}[/bold] repositórios analisados, [bold red]{failures}[/bold red] falhas "
+        f"em {time.perf_counter() - start:.1f}s"
+    )
+    if failures:
+        raise typer.Exit(code=1)
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -1,16 +1,147 @@
-from pydriller import Repository
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+import multiprocessing
 import os
-import itertools
-import lizard
+import time
+import numpy as np
+from .history import BlobReader, HistoryFilter, facts_from_commit, iter_numstat_facts, rev_list
+from .cache import ComplexityCache, MiningCache
+from .paths import PathIndex
+from .coupling import CoChangeMatrix, Interner, MinHashCoupling, connected_components
+from .profiling import DISABLED, Profiler
+from .metrics import AuthorDistribution, build_metrics_frame, hotspot_records, truck_factor
+from .timeline import Activity
+
+
+_worker_git = None
+
+
+def _init_mining_worker(repo_path: str, lock):
+    from pydriller import Git
+
+    global _worker_git
+    # PyDriller grava no .git/config ao abrir o repositório; processos abrindo juntos disputam o lock do arquivo
+    with lock:
+        _worker_git = Git(repo_path)
+
+
+def _mine_chunk(shas):
+    """Minera um bloco de commits dentro de um processo do pool."""
+    return [facts_from_commit(_worker_git.get_commit(sha)) for sha in shas]
+
+
+def _mine_numstat(repo_path: str, shas, history=None):
+    return list(iter_numstat_facts(repo_path, shas=shas, history=history))
+
+
+def _total_complexity(analysis):
+    if not analysis.function_list:
+        return 1
+    return sum([func.cyclomatic_complexity for func in analysis.function_list])
+
+
+def _complexity(file_path):
+    """Complexidade ciclomática total do arquivo, ou None se o lizard falhar."""
+    import lizard
+
+    try:
+        return _total_complexity(lizard.analyze_file(file_path))
+
+    except Exception as e:
+        print(f"Erro ao processar {file_path}: {e}")
+        return None
+
+
+def _blob_complexity(job):
+    """Complexidade de um conteúdo lido do git: job = (caminho, bytes). None se o lizard falhar."""
+    import lizard
+
+    path, content = job
+    try:
+        code = content.decode('utf-8', errors='replace')
+        return _total_complexity(lizard.analyze_file.analyze_source_code(path, code))
+
+    except Exception as e:
+        print(f"Erro ao processar {path}: {e}")
+        return None
+
+
+def _content_key(file_path):
+    """Hash de blob do git (o mesmo de `git hash-object`) + extensão, que decide a linguagem no lizard."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    blob_sha = hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+    return blob_sha + os.path.splitext(file_path)[1]
+
+
+BACKENDS = ('pydriller', 'numstat')
+COUPLING_MODES = ('auto', 'exact', 'approx')
+
+# No modo 'auto', acima de tantos arquivos tocados o acoplamento passa a ser estimado por MinHash
+APPROX_COUPLING_FILES = 20_000
+
+# Cada snapshot parcial remonta as métricas e o acoplamento exato: em históricos curtos,
+# um a cada poucos commits custaria mais que a própria mineração
+MIN_SNAPSHOT_EVERY = 25
+
+
+def snapshot_interval(limit: int) -> int:
+    """Commits entre snapshots parciais: uns 20 ao longo da análise, nunca menos de MIN_SNAPSHOT_EVERY."""
+    return max(MIN_SNAPSHOT_EVERY, limit // 20)
+
 
 class GitCollector:
-    def __init__(self, repo_path: str, limit_commits: int = 100):
+    def __init__(self, repo_path: str, limit_commits: int = 100, use_cache: bool = True, cache: MiningCache = None,
+                 workers: int = 1, backend: str = 'pydriller', complexity_cache: ComplexityCache = None,
+                 profiler: Profiler = None, facts=None, coupling_mode: str = 'auto', coupling_error: float = 0.05,
+                 history: HistoryFilter = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend}. Opções: {', '.join(BACKENDS)}")
+        if coupling_mode not in COUPLING_MODES:
+            raise ValueError(f"Modo de acoplamento desconhecido: {coupling_mode}. Opções: {', '.join(COUPLING_MODES)}")
         self.repo_path = repo_path
         self.limit = limit_commits
-        self.coupling_data = defaultdict(int) 
+        self.coupling_data = CoChangeMatrix()
+        self.authors = Interner()
         self.total_commits_analyzed = 0
-        self.all_files_metrics = {}
+        # Métricas de todos os arquivos tocados (DataFrame, uma linha por arquivo), prontas no fim do iter_metrics
+        self.file_metrics = None
+        self.path_index = None
+        # CommitFacts dos commits analisados, do mais novo para o mais antigo
+        self.window = []
+        self.use_cache = use_cache
+        self.cache = cache
+        self.mined_commits = 0
+        self.expected_commits = 0
+        self.workers = max(1, workers)
+        self.backend = backend
+        self.complexity_cache = complexity_cache
+        self.profiler = profiler or DISABLED
+        # Fatos já minerados (do mais novo para o mais antigo): a análise usa os primeiros `limit` sem tocar no git
+        self.facts = facts
+        # Recorte do histórico (datas, ponta, merges, caminhos) aplicado pelo git ao listar e ler commits
+        self.history = history or HistoryFilter()
+        # Acoplamento exato (pares contados por commit) ou estimado por MinHash ('auto' decide pelo nº de arquivos)
+        self.coupling_mode = coupling_mode
+        self.coupling_error = coupling_error
+        self.coupling_approximate = False
+        # Todas as alterações (arquivo, posição do commit), inclusive de commits grandes: base do modo aproximado
+        self._change_files = array('q')
+        self._change_commits = array('q')
+        # Autor (ID internado) e data de cada commit, pela posição: com as alterações acima, dão a
+        # autoria completa e a atividade por período
+        self._commit_authors = array('q')
+        # Pool do lizard (workers > 1), criado na primeira análise de complexidade e reaproveitado
+        # pelos snapshots parciais e pelo frame final da mesma execução
+        self._complexity_pool = None
+        self._commit_times = array('q')
+        self._change_churn = array('q')
+        self._file_rows = None
+        self.author_distribution = None
+        self.activity = None
+        self._sketch = None
 
     def should_ignore(self, filename: str, rel_path: str = None) -> bool:
         IGNORED_FILES = {
@@ -32,104 +163,350 @@ class GitCollector:
         return False
 
     def collect_metrics(self):
+        for snapshot in self.iter_metrics(snapshot_every=0):
+            pass
+        return snapshot['hotspots']
+
+    def iter_metrics(self, snapshot_every: int = 50):
+        """
+        Versão progressiva do collect_metrics: a cada `snapshot_every` commits gera um
+        snapshot parcial com os hotspots e acoplamentos vistos até ali. O último snapshot
+        (done=True) traz o resultado final, igual ao de collect_metrics.
+        """
+        try:
+            yield from self._iter_metrics(snapshot_every)
+        finally:
+            # Fechado também quando quem consome o gerador desiste no meio
+            self._close_complexity_pool()
+
+    def _iter_metrics(self, snapshot_every: int):
         print(f"Analisando os últimos {self.limit} commits em {self.repo_path}...")
         
+        # Arquivos e autores viram IDs inteiros; os dicionários abaixo são indexados por eles
+        files = self.coupling_data.files
         churn_data = defaultdict(int)
-        author_data = defaultdict(lambda: defaultdict(int))
-        file_paths = {}
         seen_files = set()
+        self.path_index = PathIndex(self.repo_path)
+        self._complexity_by_file = {}
 
-        repo = Repository(self.repo_path, order='reverse')
-        
-        commit_count = 0
         mass_update_threshold = 50
+
+        # Etapas do laço quente são somadas localmente e entregues ao profiler no fim
+        profiler = self.profiler
+        profile = profiler.enabled
+        clock = time.perf_counter
+        resolve_time = ignore_time = coupling_time = 0.0
+        changes = ignored = 0
         
-        for commit in repo.traverse_commits():
-            if commit_count >= self.limit:
-                break
-            commit_count += 1
+        for facts in profiler.timed_iter("history.mine", self._iter_commit_facts()):
+            position = self.total_commits_analyzed
             self.total_commits_analyzed += 1
+            self.window.append(facts)
+            self._commit_authors.append(self.authors.intern(facts.author))
+            self._commit_times.append(facts.timestamp)
             
             current_commit_files = []
+            current_commit_churn = []
 
-            for modified_file in commit.modified_files:
-                filename = modified_file.filename
-                rel_path = modified_file.new_path
-                
-                if self.should_ignore(filename, rel_path):
-                    continue
+            for change in facts.files:
+                if profile:
+                    changes += 1
+                    started = clock()
+                # Renomeações precisam ser registradas mesmo para arquivos ignorados
+                filename = self.path_index.resolve(change, position)
+                if profile:
+                    resolved = clock()
+                    resolve_time += resolved - started
 
-                if rel_path:
-                    file_paths[filename] = rel_path
+                skip = self.should_ignore(change.filename, filename)
+                if profile:
+                    ignore_time += clock() - resolved
+                if skip:
+                    if profile:
+                        ignored += 1
+                    continue
 
-                churn = modified_file.added_lines + modified_file.deleted_lines
-                churn_data[filename] += churn
-                author_data[filename][commit.author.name] += 1
-                seen_files.add(filename)
+                file_id = files.intern(filename)
+                churn = change.added + change.deleted
+                churn_data[file_id] += churn
+                seen_files.add(file_id)
                 
-                current_commit_files.append(filename)
+                current_commit_files.append(file_id)
+                current_commit_churn.append(churn)
+
+            self._change_files.extend(current_commit_files)
+            self._change_churn.extend(current_commit_churn)
+            self._change_commits.extend([position] * len(current_commit_files))
 
-            if len(current_commit_files) > mass_update_threshold:
-                continue
-            
             if 1 < len(current_commit_files) <= mass_update_threshold:
-                sorted_files = sorted(current_commit_files)
-                for file_a, file_b in itertools.combinations(sorted_files, 2):
-                    self.coupling_data[(file_a, file_b)] += 1
+                if profile:
+                    started = clock()
+                self.coupling_data.add_commit(current_commit_files)
+                if profile:
+                    coupling_time += clock() - started
+
+            if snapshot_every and self.total_commits_analyzed % snapshot_every == 0:
+                with profiler.span("metrics.snapshot"):
+                    frame = self._build_frame(seen_files, churn_data)
+                    snapshot = self._snapshot(hotspot_records(frame, 10), done=False)
+                yield snapshot
+
+        profiler.add("paths.resolve", resolve_time, changes)
+        profiler.add("filter.should_ignore", ignore_time, changes)
+        profiler.add("coupling.aggregate", coupling_time, self.total_commits_analyzed)
+        profiler.count("commits", self.total_commits_analyzed)
+        profiler.count("commits_mined", self.mined_commits)
+        profiler.count("file_changes", changes)
+        profiler.count("file_changes_ignored", ignored)
 
-        print(f"Commits: {self.total_commits_analyzed}")
+        print(f"Commits: {self.total_commits_analyzed} ({self.mined_commits} minerados, {self.total_commits_analyzed - self.mined_commits} do cache)")
         print(f"Arquivos únicos tocados: {len(seen_files)}")
 
-        hotspots = []
-        for filename in seen_files:
-            full_path = None
-            if filename in file_paths:
-                 full_path = os.path.join(self.repo_path, file_paths[filename])
-            
-            if not full_path or not os.path.exists(full_path):
-                full_path = self._find_file(filename)
+        with profiler.span("metrics.hotspots"):
+            self.file_metrics = self._build_frame(seen_files, churn_data)
+            snapshot = self._snapshot(hotspot_records(self.file_metrics, 10), done=True)
 
-            complexity = 1
-            if full_path and os.path.exists(full_path):
-                complexity = self._calc_complexity(full_path)
+        yield snapshot
 
-            total_churn = churn_data[filename]
-            risk_score = total_churn * complexity
-            
-            hotspot = {
-                "file": filename,
-                "churn": total_churn,
-                "complexity": complexity,
-                "risk_score": risk_score,
-                "top_authors": dict(sorted(author_data[filename].items(), key=lambda x: x[1], reverse=True)[:2])
-            }
-            hotspots.append(hotspot)
-            self.all_files_metrics[filename] = hotspot
+    def _snapshot(self, hotspots, done: bool):
+        return {
+            "commits_analyzed": self.total_commits_analyzed,
+            "total_commits": self.expected_commits,
+            "hotspots": hotspots,
+            # Parciais usam sempre a contagem exata: remontar as assinaturas a cada snapshot sairia caro
+            "coupling": self.get_coupling_analysis(min_shared_commits=3, approximate=None if done else False),
+            "done": done
+        }
+
+    def _build_frame(self, seen_files, churn_data):
+        """Monta as métricas em colunas dos arquivos vistos. A complexidade de cada arquivo é calculada uma vez por análise."""
+        files = self.coupling_data.files
+
+        pending = {}
+        for file_id in seen_files:
+            if file_id not in self._complexity_by_file:
+                full_path = self.path_index.locate(files.names[file_id])
+                if full_path:
+                    pending[file_id] = full_path
+                else:
+                    self._complexity_by_file[file_id] = 1
 
-        return sorted(hotspots, key=lambda x: x['risk_score'], reverse=True)[:10]
-    
-    def get_coupling_analysis(self, min_shared_commits=3):
+        if pending:
+            with self.profiler.span("complexity.lizard"):
+                complexities = self._calc_complexities(set(pending.values()))
+            for file_id, full_path in pending.items():
+                self._complexity_by_file[file_id] = complexities[full_path]
+
+        ids = sorted(seen_files)
+        row_of = np.full(len(files), -1, dtype=np.int64)
+        row_of[ids] = np.arange(len(ids))
+        self._file_rows = row_of
+        change_files = np.frombuffer(self._change_files, dtype=np.int64)
+        change_authors = np.frombuffer(self._commit_authors, dtype=np.int64)[np.frombuffer(self._change_commits, dtype=np.int64)]
+        self.author_distribution = AuthorDistribution.from_changes(
+            len(ids), self.authors.names, row_of[change_files], change_authors
+        )
+        del change_files, change_authors  # solta os buffers: os arrays ainda crescem durante a análise
+
+        return build_metrics_frame(
+            [files.names[file_id] for file_id in ids],
+            [churn_data[file_id] for file_id in ids],
+            [self._complexity_by_file[file_id] for file_id in ids],
+            self.author_distribution,
+        )
+
+    def _iter_commit_facts(self):
+        """
+        Gera os fatos dos últimos `limit` commits, do mais novo para o mais antigo.
+        Com `facts`, só recorta a lista recebida. Com cache, só os commits ainda não vistos são minerados; eles são gerados
+        conforme ficam prontos e gravados no cache em lotes.
+        """
+        if self.facts is not None:
+            selected = self.facts[:self.limit]
+            self.expected_commits = len(selected)
+            yield from selected
+            return
+
+        with self.profiler.span("history.rev_list"):
+            shas = rev_list(self.repo_path, self.limit, history=self.history)
+        self.expected_commits = len(shas)
+
+        if not self.use_cache and self.workers == 1 and self.backend == 'numstat':
+            for facts in iter_numstat_facts(self.repo_path, limit=self.limit, history=self.history):
+                self.mined_commits += 1
+                yield facts
+            return
+
+        if not self.use_cache and self.workers == 1 and self.history == HistoryFilter():
+            from pydriller import Repository
+
+            repo = Repository(self.repo_path, order='reverse')
+            for commit_count, commit in enumerate(repo.traverse_commits()):
+                if commit_count >= self.limit:
+                    break
+                self.mined_commits += 1
+                yield facts_from_commit(commit)
+            return
+
+        if self.use_cache and self.cache is None:
+            # O numstat recortado por caminho só lê os arquivos do recorte: esses fatos parciais têm cache próprio.
+            # O PyDriller sempre lê o commit inteiro, então usa o cache comum e recorta na hora
+            scoped = self.backend == 'numstat' and self.history.paths
+            self.cache = MiningCache(scope="\0".join(sorted(self.history.paths)) if scoped else "")
+
+        with self.profiler.span("cache.load"):
+            known = self.cache.load(shas) if self.use_cache else {}
+        missing = [sha for sha in shas if sha not in known]
+        mined = self._iter_mined(missing)
+        batch = []
+
+        scope = self.history.scope
+        try:
+            for sha in shas:
+                if sha in known:
+                    yield scope(known[sha], self.repo_path)
+                    continue
+
+                facts = next(mined)
+                if facts.sha != sha:
+                    raise RuntimeError(f"Commit {sha} esperado, {facts.sha} recebido do backend {self.backend}")
+                self.mined_commits += 1
+                if self.use_cache:
+                    batch.append(facts)
+                    if len(batch) >= 200:
+                        with self.profiler.span("cache.store"):
+                            self.cache.store(batch)
+                        batch = []
+                yield scope(facts, self.repo_path)
+        finally:
+            mined.close()
+            if batch:
+                with self.profiler.span("cache.store"):
+                    self.cache.store(batch)
+
+    def _iter_mined(self, shas):
+        """
+        Minera os SHAs pedidos, em paralelo quando workers > 1, gerando os fatos na ordem original.
+        Assim a agregação posterior é idêntica à serial.
+        """
+        if self.workers == 1 or len(shas) < 2:
+            if self.backend == 'numstat':
+                yield from iter_numstat_facts(self.repo_path, shas=shas, history=self.history)
+                return
+            from pydriller import Git
+
+            git = Git(self.repo_path)
+            try:
+                for sha in shas:
+                    yield facts_from_commit(git.get_commit(sha))
+            finally:
+                git.clear()
+            return
+
+        # Blocos menores que len/workers equilibram commits com diffs muito desiguais
+        num_chunks = min(len(shas), self.workers * 4)
+        chunk_size = -(-len(shas) // num_chunks)
+        chunks = [shas[i:i + chunk_size] for i in range(0, len(shas), chunk_size)]
+
+        if self.backend == 'numstat':
+            # O trabalho pesado acontece no processo do git; threads bastam para paralelizar
+            executor = ThreadPoolExecutor(max_workers=min(self.workers, len(chunks)))
+            results = executor.map(_mine_numstat, [self.repo_path] * len(chunks), chunks, [self.history] * len(chunks))
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.workers, len(chunks)),
+                initializer=_init_mining_worker,
+                initargs=(self.repo_path, multiprocessing.Lock())
+            )
+            results = executor.map(_mine_chunk, chunks)
+
+        try:
+            for chunk_facts in results:
+                yield from chunk_facts
+        finally:
+            # Se a análise for interrompida, os blocos que ainda não começaram são descartados
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_activity(self) -> Activity:
+        """
+        Churn, alterações e autores por arquivo e dia (linhas na ordem de `file_metrics`),
+        base das janelas de tempo e tendências; None antes de a análise terminar.
+        """
+        if self.activity is None and self.file_metrics is not None:
+            with self.profiler.span("metrics.activity"):
+                commits = np.frombuffer(self._change_commits, dtype=np.int64)
+                self.activity = Activity.from_changes(
+                    self.file_metrics["file"].tolist(), self.authors.names,
+                    self._file_rows[np.frombuffer(self._change_files, dtype=np.int64)],
+                    np.frombuffer(self._commit_times, dtype=np.int64)[commits],
+                    np.frombuffer(self._commit_authors, dtype=np.int64)[commits],
+                    np.frombuffer(self._change_churn, dtype=np.int64),
+                )
+        return self.activity
+
+    def get_truck_factor(self):
+        """
+        Truck Factor do repositório (ver metrics.truck_factor) sobre a autoria completa
+        dos arquivos analisados; None antes de a análise terminar.
+        """
+        if self.author_distribution is None:
+            return None
+        with self.profiler.span("metrics.truck_factor"):
+            return truck_factor(self.author_distribution)
+
+    def use_approximate_coupling(self) -> bool:
+        """Se o acoplamento sai do MinHash: modo 'approx', ou 'auto' com mais de APPROX_COUPLING_FILES arquivos."""
+        if not len(self._change_files):
+            return False  # sem as alterações (ex.: coletor reconstruído de um snapshot), só há a contagem exata
+        if self.coupling_mode == 'auto':
+            return len(self.coupling_data.files) > APPROX_COUPLING_FILES
+        return self.coupling_mode == 'approx'
+
+    def approximate_coupling(self) -> MinHashCoupling:
+        """Assinaturas MinHash de todas as alterações vistas, montadas uma vez e refeitas só se houver commits novos."""
+        if self._sketch is None or self._sketch[0] != len(self._change_files):
+            with self.profiler.span("coupling.minhash"):
+                sketch = MinHashCoupling(self.coupling_data.files, error=self.coupling_error)
+                sketch.fit(self._change_files, self._change_commits)
+            self._sketch = (len(self._change_files), sketch)
+        return self._sketch[1]
+
+    def get_coupling_analysis(self, min_shared_commits=3, approximate: bool = None):
         """
         Retorna os pares de arquivos com maior acoplamento lógico.
         min_shared_commits: Mínimo de vezes que devem ter mudado juntos para aparecer.
+        approximate: estimar por MinHash/LSH (inclui commits acima de 50 arquivos, que a
+        contagem exata descarta); None decide pelo `coupling_mode`.
         """
+        if approximate is None:
+            approximate = self.use_approximate_coupling()
+        self.coupling_approximate = approximate
         results = []
-        for (file_a, file_b), count in self.coupling_data.items():
-            if count >= min_shared_commits:
-                strength = (count / self.total_commits_analyzed) * 100 
-                
-                results.append({
-                    "file_a": file_a,
-                    "file_b": file_b,
-                    "shared_commits": count,
-                    "strength": f"{strength:.1f}%"
-                })
+        with self.profiler.span("coupling.top_pairs"):
+            if approximate:
+                top_pairs = self.approximate_coupling().top_pairs(10, min_shared_commits)
+            else:
+                top_pairs = self.coupling_data.top_pairs(10, min_shared_commits)
+        for (file_a, file_b), count in top_pairs:
+            strength = (count / self.total_commits_analyzed) * 100 
+            
+            results.append({
+                "file_a": file_a,
+                "file_b": file_b,
+                "shared_commits": count,
+                "strength": f"{strength:.1f}%",
+                "estimated": approximate
+            })
         
-        return sorted(results, key=lambda x: x['shared_commits'], reverse=True)[:10]
+        return results
 
-    def get_logical_coupling(self, min_shared_commits: int = 2):
+    def get_logical_coupling(self, min_shared_commits: int = 2, max_edges: int = 300, edges_per_node: int = 5,
+                             min_component_size: int = 2):
         """
         Retorna dados formatados para visualização em grafo de acoplamento lógico.
+        O grafo tem tamanho limitado: cada arquivo contribui com no máximo `edges_per_node`
+        arestas (as mais fortes), o total fica em `max_edges` e componentes conexos com
+        menos de `min_component_size` arquivos são descartados.
         """
 
         def get_file_color(filename: str) -> str:
@@ -150,42 +527,50 @@ class GitCollector:
             }
             return color_map.get(ext, '#CCCCCC')
         
+        with self.profiler.span("coupling.backbone"):
+            backbone = self.coupling_data.backbone(min_shared_commits, per_node=edges_per_node, max_edges=max_edges)
+        if min_component_size > 2:
+            components = connected_components(pair for pair, _ in backbone)
+            sizes = defaultdict(int)
+            for label in components.values():
+                sizes[label] += 1
+            backbone = [(pair, count) for pair, count in backbone if sizes[components[pair[0]]] >= min_component_size]
+
+        # Tamanho do nó - risk_score
+        min_size, max_size = 15, 50
+        risk_by_file = dict(zip(self.file_metrics['file'], self.file_metrics['risk_score'].tolist())) if self.file_metrics is not None else {}
+        max_risk = max(risk_by_file.values(), default=1)
+
         nodes = {}
         edges = []
         
-        for (file_a, file_b), count in self.coupling_data.items():
-            if count >= min_shared_commits:
-                for file in [file_a, file_b]:
-                    if file not in nodes:
-                        metrics = self.all_files_metrics.get(file, {})
-                        risk_score = metrics.get('risk_score', 0)
-                        
-                        # Tamanho do nó - risk_score
-                        min_size, max_size = 15, 50
-                        all_risks = [m.get('risk_score', 0) for m in self.all_files_metrics.values()]
-                        max_risk = max(all_risks) if all_risks else 1
-                        node_size = min_size + (risk_score / max_risk * (max_size - min_size)) if max_risk > 0 else min_size
-                        
-                        nodes[file] = {
-                            'id': file,
-                            'label': file,
-                            'title': f"{file}\nRisk Score: {risk_score:.0f}",
-                            'size': node_size,
-                            'color': get_file_color(file)
-                        }
-                
-                edges.append({
-                    'source': file_a,
-                    'target': file_b,
-                    'weight': count,
-                    'title': f"{count} commits compartilhados"
-                })
+        for (file_a, file_b), count in backbone:
+            for file in [file_a, file_b]:
+                if file not in nodes:
+                    risk_score = risk_by_file.get(file, 0)
+                    node_size = min_size + (risk_score / max_risk * (max_size - min_size)) if max_risk > 0 else min_size
+                    
+                    nodes[file] = {
+                        'id': file,
+                        'label': os.path.basename(file),
+                        'title': f"{file}\nRisk Score: {risk_score:.0f}",
+                        'size': node_size,
+                        'color': get_file_color(file)
+                    }
+            
+            edges.append({
+                'source': file_a,
+                'target': file_b,
+                'weight': count,
+                'title': f"{count} commits compartilhados"
+            })
         
         nodes_list = list(nodes.values())
         
         stats = {
             'total_nodes': len(nodes_list),
             'total_edges': len(edges),
+            'candidate_edges': int((self.coupling_data.counts >= min_shared_commits).sum()),
             'max_coupling_strength': max([e['weight'] for e in edges]) if edges else 0,
             'avg_coupling_strength': sum([e['weight'] for e in edges]) / len(edges) if edges else 0
         }
@@ -196,22 +581,118 @@ class GitCollector:
             'stats': stats
         }
 
-
     def _calc_complexity(self, file_path):
         """Calcula Complexidade Ciclomática"""
-        try:
-            analysis = lizard.analyze_file(file_path)
-            if not analysis.function_list:
-                return 1
-            total_cc = sum([func.cyclomatic_complexity for func in analysis.function_list])
-            return total_cc
-
-        except Exception as e:
-            print(f"Erro ao processar {file_path}: {e}")
-            return 0
-
-    def _find_file(self, name):
-        for root, dirs, files in os.walk(self.repo_path):
-            if name in files:
-                return os.path.join(root, name)
-        return None
\ No newline at end of file
+        complexity = _complexity(file_path)
+        return 0 if complexity is None else complexity
+
+    def _calc_complexities(self, file_paths):
+        """
+        Complexidade de vários arquivos de uma vez.
+        Conteúdos já analisados vêm do cache; os demais são analisados em paralelo quando workers > 1.
+        """
+        file_paths = sorted(file_paths)
+        keys = {}
+        if self.use_cache:
+            for file_path in file_paths:
+                try:
+                    keys[file_path] = _content_key(file_path)
+                except OSError:
+                    pass
+            cached = self._complexity_store().load(set(keys.values()))
+        else:
+            cached = {}
+
+        results = {path: cached[keys[path]] for path in file_paths if keys.get(path) in cached}
+        pending = [path for path in file_paths if path not in results]
+        self.profiler.count("complexity.cache_hits", len(results))
+        self.profiler.count("complexity.analyzed", len(pending))
+        computed = self._map_complexity(_complexity, pending)
+
+        fresh = {}
+        for path, complexity in zip(pending, computed):
+            results[path] = 0 if complexity is None else complexity
+            # Falhas do lizard não vão para o cache, para serem tentadas de novo
+            if complexity is not None and path in keys:
+                fresh[keys[path]] = complexity
+        if fresh:
+            self.complexity_cache.store(fresh)
+
+        return results
+
+    def _complexity_store(self):
+        if self.complexity_cache is None:
+            self.complexity_cache = ComplexityCache()
+        return self.complexity_cache
+
+    def _map_complexity(self, func, jobs):
+        """Aplica `func` (lizard, CPU-bound) aos jobs, em processos quando workers > 1."""
+        if self.workers > 1 and len(jobs) > 1:
+            if self._complexity_pool is None:
+                self._complexity_pool = ProcessPoolExecutor(max_workers=self.workers)
+            return list(self._complexity_pool.map(func, jobs, chunksize=max(1, len(jobs) // (self.workers * 4))))
+        return [func(job) for job in jobs]
+
+    def _close_complexity_pool(self):
+        if self._complexity_pool is not None:
+            self._complexity_pool.shutdown()
+            self._complexity_pool = None
+
+    def get_complexity_trend(self, files=None, samples: int = 10):
+        """
+        Complexidade de cada arquivo em até `samples` commits igualmente espaçados da janela
+        analisada, do mais antigo para o mais novo. O conteúdo vem direto dos blobs de cada
+        revisão (sem checkout), então arquivos removidos ou renomeados também têm histórico.
+        Sem `files`, usa os 10 maiores hotspots. Complexidade None = arquivo não existia no commit.
+        """
+        if not self.window:
+            return {}
+        if files is None:
+            files = [h['file'] for h in hotspot_records(self.file_metrics, 10)] if self.file_metrics is not None else []
+
+        last = len(self.window) - 1
+        count = max(1, min(samples, len(self.window)))
+        # Posição 0 é o commit mais novo; a lista vai do mais antigo para o mais novo
+        positions = sorted({round(i * last / (count - 1)) for i in range(count)} if count > 1 else {0}, reverse=True)
+
+        specs = {}
+        for file in files:
+            for position in positions:
+                path = self.path_index.path_at(file, position)
+                if path:
+                    specs[(file, position)] = f"{self.window[position].sha}:{path.replace(os.sep, '/')}"
+
+        with self.profiler.span("complexity.trend_blobs"), BlobReader(self.repo_path) as reader:
+            infos = reader.info_many(set(specs.values()))
+            keys = {spec: info[0] + os.path.splitext(spec)[1] for spec, info in infos.items() if info}
+            cached = self._complexity_store().load(set(keys.values())) if self.use_cache else {}
+
+            # O mesmo blob costuma se repetir entre revisões; cada conteúdo é lido e analisado uma vez
+            to_read = {}
+            for spec, key in keys.items():
+                if key not in cached:
+                    to_read.setdefault(key, spec)
+            contents = reader.read_many(to_read.values())
+
+        jobs = [(spec.split(':', 1)[1], contents[spec] or b"") for spec in to_read.values()]
+        with self.profiler.span("complexity.trend_lizard"):
+            try:
+                fresh = {key: complexity for key, complexity in zip(to_read, self._map_complexity(_blob_complexity, jobs))}
+            finally:
+                self._close_complexity_pool()
+        if self.use_cache:
+            self._complexity_store().store({key: value for key, value in fresh.items() if value is not None})
+        values = {**cached, **fresh}
+
+        trends = {}
+        for file in files:
+            points = []
+            for position in positions:
+                sha, timestamp = self.window[position].sha, self.window[position].timestamp
+                key = keys.get(specs.get((file, position)))
+                complexity = None
+                if key is not None:
+                    complexity = values[key] if values[key] is not None else 0
+                points.append({"sha": sha, "timestamp": timestamp, "complexity": complexity})
+            trends[file] = points
+        return trends
@@ -1,5 +1,4 @@
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +6,9 @@ load_dotenv()
 class Config:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-    
-    if GOOGLE_API_KEY:
-        genai.configure(api_key=GOOGLE_API_KEY)
\ No newline at end of file
+    # Validade, em segundos, dos relatórios da IA guardados em cache (padrão: 7 dias)
+    AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", 7 * 24 * 3600))
+    # Quantas seções do relatório podem ser geradas ao mesmo tempo
+    AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", 4))
+    # Orçamento aproximado de tokens para os dados do repositório em cada prompt (0 = sem limite)
+    AI_TOKEN_BUDGET = int(os.getenv("AI_TOKEN_BUDGET", 4000))
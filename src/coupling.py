@@ -0,0 +1,390 @@
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+class Interner:
+    """Mapeia nomes (arquivos, autores) para IDs inteiros sequenciais."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def intern(self, name: str) -> int:
+        id_ = self.ids.get(name)
+        if id_ is None:
+            id_ = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return id_
+
+    @classmethod
+    def from_names(cls, names) -> "Interner":
+        """Interner com os IDs já atribuídos: o nome na posição i recebe o ID i."""
+        interner = cls()
+        interner.names = list(names)
+        interner.ids = {name: id_ for id_, name in enumerate(interner.names)}
+        return interner
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CoChangeMatrix:
+    """
+    Matriz esparsa de co-alterações entre arquivos.
+
+    Cada par é um int64 (id_menor << 32 | id_maior). Os pares de cada commit são
+    acumulados em blocos (formato COO) e, de tempos em tempos, compactados em dois
+    arrays ordenados: chaves únicas e contagens. A memória fica proporcional aos
+    pares distintos, não ao total de co-alterações, e não há tuplas de strings.
+    """
+
+    COMPACT_EVERY = 2_000_000
+
+    def __init__(self, files: Interner = None):
+        self.files = files if files is not None else Interner()
+        self._keys = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self._pending_size = 0
+
+    @classmethod
+    def from_counts(cls, files: Interner, keys, counts) -> "CoChangeMatrix":
+        """Reconstrói a matriz a partir de chaves de par e contagens já agregadas (ex.: de um snapshot)."""
+        matrix = cls(files)
+        keys = np.asarray(keys, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        matrix._keys = keys[order]
+        matrix._counts = np.asarray(counts, dtype=np.int64)[order]
+        return matrix
+
+    def pair_ids(self) -> Tuple[np.ndarray, np.ndarray]:
+        """IDs (menor, maior) dos arquivos de cada par, alinhados com `keys` e `counts`."""
+        keys = self.keys
+        return keys >> 32, keys & 0xFFFFFFFF
+
+    def add_commit(self, file_ids):
+        """Registra uma co-alteração para cada par de arquivos do commit."""
+        ids = np.unique(np.asarray(file_ids, dtype=np.int64))
+        if len(ids) < 2:
+            return
+        i, j = np.triu_indices(len(ids), k=1)
+        self._pending.append((ids[i] << 32) | ids[j])
+        self._pending_size += len(i)
+        if self._pending_size >= self.COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        if not self._pending:
+            return
+        pending = np.concatenate(self._pending)
+        keys = np.concatenate([self._keys, pending])
+        weights = np.concatenate([self._counts, np.ones(len(pending), dtype=np.int64)])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._counts = np.bincount(inverse, weights=weights, minlength=len(self._keys)).astype(np.int64)
+        self._pending = []
+        self._pending_size = 0
+
+    @property
+    def keys(self) -> np.ndarray:
+        self._compact()
+        return self._keys
+
+    @property
+    def counts(self) -> np.ndarray:
+        self._compact()
+        return self._counts
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.counts.nbytes
+
+    def _pair(self, key) -> Tuple[str, str]:
+        # Pares saem em ordem alfabética dos caminhos, como no formato antigo (file_a < file_b)
+        a = self.files.names[int(key) >> 32]
+        b = self.files.names[int(key) & 0xFFFFFFFF]
+        return (a, b) if a <= b else (b, a)
+
+    def get(self, file_a: str, file_b: str) -> int:
+        a, b = self.files.ids.get(file_a), self.files.ids.get(file_b)
+        if a is None or b is None or a == b:
+            return 0
+        key = (min(a, b) << 32) | max(a, b)
+        pos = np.searchsorted(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            return int(self.counts[pos])
+        return 0
+
+    def items(self, min_count: int = 1) -> Iterator[Tuple[Tuple[str, str], int]]:
+        """((file_a, file_b), contagem) dos pares com pelo menos `min_count` co-alterações."""
+        selected = np.flatnonzero(self.counts >= min_count)
+        for key, count in zip(self.keys[selected].tolist(), self.counts[selected].tolist()):
+            yield self._pair(key), count
+
+    def top_pairs(self, k: int, min_count: int = 1) -> List[Tuple[Tuple[str, str], int]]:
+        """
+        Os `k` pares mais fortes, sem ordenar a matriz inteira: argpartition seleciona
+        os candidatos e só eles são ordenados. Empates são desfeitos pela chave do par.
+        """
+        keys, counts = self.keys, self.counts
+        selected = np.flatnonzero(counts >= min_count)
+        if k <= 0 or not len(selected):
+            return []
+        if k < len(selected):
+            top = np.argpartition(-counts[selected], k - 1)[:k]
+            kth = counts[selected][top].min()
+            selected = selected[counts[selected] >= kth]
+        order = np.lexsort((keys[selected], -counts[selected]))[:k]
+        return [(self._pair(key), int(count))
+                for key, count in zip(keys[selected][order].tolist(), counts[selected][order].tolist())]
+
+    def backbone(self, min_count: int = 1, per_node: int = 5, max_edges: int = 300) -> List[Tuple[Tuple[str, str], int]]:
+        """
+        Subconjunto dos pares para visualização em grafo, com tamanho limitado.
+        Um par fica se estiver entre os `per_node` mais fortes de pelo menos um dos
+        seus arquivos; do que sobra, ficam os `max_edges` mais fortes.
+        """
+        keys, counts = self.keys, self.counts
+        selected = counts >= min_count
+        keys, counts = keys[selected], counts[selected]
+        if not len(keys) or max_edges <= 0:
+            return []
+
+        order = np.lexsort((keys, -counts))
+        keys, counts = keys[order], counts[order]
+
+        if per_node > 0:
+            keep = (_rank_within_groups(keys >> 32) < per_node) | (_rank_within_groups(keys & 0xFFFFFFFF) < per_node)
+            keys, counts = keys[keep], counts[keep]
+
+        keys, counts = keys[:max_edges], counts[:max_edges]
+        return [(self._pair(key), count) for key, count in zip(keys.tolist(), counts.tolist())]
+
+
+class MinHashCoupling:
+    """
+    Acoplamento aproximado para históricos enormes: MinHash + LSH.
+
+    Cada arquivo vira uma assinatura de `num_perm` mínimos de hashes dos commits em que
+    mudou. A fração de posições iguais entre duas assinaturas estima o Jaccard dos
+    conjuntos de commits, com desvio padrão de no máximo 1/(2·√num_perm) — é o `error`
+    pedido. O LSH divide a assinatura em faixas; só pares que coincidem inteiros em
+    alguma faixa viram candidatos, então o custo é quase linear no número de
+    alterações, sem contar pares por commit. Commits grandes (refatorações em massa)
+    entram normalmente. Pares com Jaccard a partir de `threshold` são achados com 95% de
+    chance; abaixo disso, cada vez menos — um arquivo que muda em quase todo commit tem
+    Jaccard baixo com todos e seus pares tendem a ficar de fora.
+
+    Memória: as assinaturas ocupam n_arquivos × num_perm × 4 bytes, o dobro durante o
+    fit (são montadas por permutação e depois transpostas). Com o erro padrão de 5%
+    (100 permutações), 100 mil arquivos custam 40 MB; com 2% (625), 250 MB. `num_perm`
+    nunca passa de MAX_PERM: pedir erro menor que 1/(2·√MAX_PERM) não cria mais permutações.
+    """
+
+    PRIME = (1 << 31) - 1
+    # Teto de permutações (erro ~1,6%): 1/(4·erro²) cresce rápido e estouraria a memória
+    MAX_PERM = 1024
+    # Multiplicador ímpar de 64 bits para juntar as linhas de uma faixa numa chave só
+    BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, files: Interner, error: float = 0.05, threshold: float = 0.3, seed: int = 0,
+                 max_bucket: int = 200):
+        self.files = files
+        self.error = error
+        self.num_perm = min(self.MAX_PERM, max(16, int(np.ceil(1 / (4 * error ** 2)))))
+        self.bands, self.rows = _lsh_bands(self.num_perm, threshold)
+        self.max_bucket = max_bucket
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self.PRIME, self.num_perm, dtype=np.int64)
+        self._b = rng.integers(0, self.PRIME, self.num_perm, dtype=np.int64)
+        # Uma linha por arquivo: os pares comparam linhas inteiras, contíguas na memória
+        self.signatures = np.empty((0, self.num_perm), dtype=np.uint32)
+        self.commit_counts = np.empty(0, dtype=np.int64)
+
+    def fit(self, file_ids, commit_ids) -> "MinHashCoupling":
+        """Monta as assinaturas a partir das alterações: `file_ids[i]` mudou no commit `commit_ids[i]`."""
+        n_files = len(self.files)
+        pairs = np.unique((np.asarray(file_ids, dtype=np.int64) << 32) | np.asarray(commit_ids, dtype=np.int64))
+        file_ids, commit_ids = pairs >> 32, pairs & 0xFFFFFFFF
+        self.commit_counts = np.bincount(file_ids, minlength=n_files)
+
+        by_perm = np.full((self.num_perm, n_files), np.iinfo(np.uint32).max, dtype=np.uint32)
+        if len(pairs):
+            # `pairs` já vem ordenado por arquivo: cada arquivo é um trecho contíguo e reduceat tira o mínimo de cada um
+            starts = np.flatnonzero(np.r_[True, file_ids[1:] != file_ids[:-1]])
+            present = file_ids[starts]
+            for i in range(self.num_perm):
+                hashes = (self._a[i] * commit_ids + self._b[i]) % self.PRIME
+                by_perm[i, present] = np.minimum.reduceat(hashes, starts)
+        # Preenchido por permutação (escrita contígua), guardado por arquivo (leitura contígua)
+        self.signatures = np.ascontiguousarray(by_perm.T)
+        return self
+
+    def _band_keys(self, files, band: int) -> np.ndarray:
+        rows = self.signatures[files, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+        keys = np.zeros(len(files), dtype=np.uint64)
+        for column in rows.T:
+            keys = keys * self.BAND_MIX + column
+        return keys
+
+    def candidates(self, min_count: int = 1) -> np.ndarray:
+        """
+        Chaves (id_menor << 32 | id_maior) dos pares que coincidem em alguma faixa do LSH
+        e cuja estimativa de commits em comum chega a `min_count`. Cada faixa é filtrada
+        logo após gerar seus pares, então a memória acompanha os pares relevantes.
+        """
+        eligible = np.flatnonzero(self.commit_counts >= max(1, min_count))
+        if len(eligible) < 2:
+            return np.empty(0, dtype=np.int64)
+        # Em baldes enormes (arquivos que só mudaram juntos numa refatoração), ficam os mais alterados
+        by_activity = eligible[np.argsort(-self.commit_counts[eligible], kind='stable')]
+        found = []
+        for band in range(self.bands):
+            _, bucket, sizes = np.unique(self._band_keys(by_activity, band), return_inverse=True, return_counts=True)
+            bucket = bucket.ravel()
+            shared = np.flatnonzero(sizes[bucket] > 1)
+            if not len(shared):
+                continue
+            # Membros de cada balde em sequência (mais alterados primeiro), no máximo `max_bucket` por balde
+            order = shared[np.argsort(bucket[shared], kind='stable')]
+            groups = bucket[order]
+            first = np.r_[True, groups[1:] != groups[:-1]]
+            group_start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+            keep = np.arange(len(order)) - group_start < self.max_bucket
+            members, groups = by_activity[order[keep]], groups[keep]
+            # Todos os pares de cada balde, sem laço: cada membro pareia com os seguintes do mesmo balde
+            boundaries = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1], True])
+            group_end = np.repeat(boundaries[1:], np.diff(boundaries))
+            position = np.arange(len(members))
+            partners = group_end - position - 1
+            left = np.repeat(position, partners)
+            right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(partners) - partners, partners)
+            low, high = np.minimum(members[left], members[right]), np.maximum(members[left], members[right])
+            keys = np.unique((low << 32) | high)
+            _, estimated = self.estimate(keys)
+            found.append(keys[estimated >= min_count])
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def estimate(self, keys, chunk: int = 65_536):
+        """(Jaccard, commits em comum) estimados para cada par, em blocos para limitar a memória."""
+        a, b = keys >> 32, keys & 0xFFFFFFFF
+        jaccard = np.empty(len(keys))
+        for start in range(0, len(keys), chunk):
+            end = start + chunk
+            jaccard[start:end] = (self.signatures[a[start:end]] == self.signatures[b[start:end]]).mean(axis=1)
+        # |A ∩ B| = J · (|A| + |B|) / (1 + J)
+        shared = np.rint(jaccard * (self.commit_counts[a] + self.commit_counts[b]) / (1 + jaccard)).astype(np.int64)
+        return jaccard, shared
+
+    def top_pairs(self, k: int, min_count: int = 1) -> List[Tuple[Tuple[str, str], int]]:
+        """Os `k` pares com mais commits em comum (estimados), no formato de CoChangeMatrix.top_pairs."""
+        keys = self.candidates(min_count)
+        if k <= 0 or not len(keys):
+            return []
+        _, shared = self.estimate(keys)
+        order = np.lexsort((keys, -shared))[:k]
+        names = self.files.names
+        pairs = []
+        for key, count in zip(keys[order].tolist(), shared[order].tolist()):
+            a, b = names[key >> 32], names[key & 0xFFFFFFFF]
+            pairs.append(((a, b) if a <= b else (b, a), count))
+        return pairs
+
+
+def _lsh_bands(num_perm: int, threshold: float, recall: float = 0.95) -> Tuple[int, int]:
+    """
+    Faixas e linhas por faixa do LSH. Um par com Jaccard J vira candidato com
+    probabilidade 1 - (1 - J^linhas)^faixas; escolhe o maior número de linhas (menos
+    candidatos falsos) que ainda acha pares com J = `threshold` com chance >= `recall`.
+    """
+    best = (num_perm, 1)
+    for rows in range(2, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands < recall:
+            break
+        best = (bands, rows)
+    return best
+
+
+def _rank_within_groups(groups: np.ndarray) -> np.ndarray:
+    """Posição de cada elemento entre os do mesmo grupo, preservando a ordem original."""
+    idx = np.argsort(groups, kind='stable')
+    sorted_groups = groups[idx]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    ranks = np.empty(len(groups), dtype=np.int64)
+    ranks[idx] = np.arange(len(groups)) - np.repeat(starts, sizes)
+    return ranks
+
+
+def connected_components(edges) -> Dict[str, int]:
+    """Rótulo do componente conexo de cada nó (union-find sobre a lista de arestas)."""
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b in edges:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    labels = {}
+    return {node: labels.setdefault(find(node), len(labels)) for node in parent}
+
+
+def force_layout(n: int, sources, targets, weights=None, iterations: int = 120, seed: int = 0) -> np.ndarray:
+    """
+    Posições 2D (array n x 2, dentro de [-1, 1]) por Fruchterman-Reingold vetorizado.
+
+    Cada iteração calcula a repulsão entre todos os pares de nós de uma vez (O(n²) em
+    NumPy) e a atração ao longo das arestas, proporcional ao peso. Uma gravidade fraca
+    puxa os componentes desconexos para o centro. A semente fixa torna o resultado
+    reproduzível: o mesmo grafo gera sempre o mesmo desenho.
+    """
+    if n <= 1:
+        return np.zeros((n, 2))
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=float)
+    if len(weights) and weights.max() > 0:
+        weights = weights / weights.max()
+
+    pos = np.random.default_rng(seed).uniform(-1, 1, (n, 2))
+    k = np.sqrt(4.0 / n)
+    temperature = 0.2
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        dx = np.subtract.outer(pos[:, 0], pos[:, 0])
+        dy = np.subtract.outer(pos[:, 1], pos[:, 1])
+        dist2 = dx * dx
+        dist2 += dy * dy
+        np.maximum(dist2, 1e-4, out=dist2)
+        np.fill_diagonal(dist2, np.inf)
+        # Repulsão k²/d na direção do outro nó: delta * k² / d²
+        strength = np.divide(k * k, dist2, out=dist2)
+        displacement = np.column_stack(((dx * strength).sum(axis=1), (dy * strength).sum(axis=1)))
+
+        if len(sources):
+            edge = pos[sources] - pos[targets]
+            # Atração d²/k: edge * |edge| / k
+            pull = edge * (np.sqrt((edge ** 2).sum(axis=1)) * weights / k)[:, None]
+            np.add.at(displacement, sources, -pull)
+            np.add.at(displacement, targets, pull)
+
+        displacement -= pos * (0.1 * k)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    pos -= pos.mean(axis=0)
+    scale = np.abs(pos).max()
+    return pos / scale if scale > 0 else pos
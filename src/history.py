@@ -0,0 +1,373 @@
+import os
+import subprocess
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class FileChange(NamedTuple):
+    filename: str
+    old_path: Optional[str]
+    new_path: Optional[str]
+    added: int
+    deleted: int
+
+
+class CommitFacts(NamedTuple):
+    """Fatos mínimos de um commit: tudo que churn, autoria e acoplamento precisam."""
+    sha: str
+    author: str
+    timestamp: int
+    files: Tuple[FileChange, ...]
+
+
+class HistoryFilter(NamedTuple):
+    """
+    Recorte do histórico aplicado pelo próprio git (rev-list/log): commits fora dele
+    nunca são lidos. `rev` é a ponta percorrida (branch, tag ou SHA); `since`/`until`
+    aceitam qualquer data do git ("2024-01-01", "3 months ago"). `paths` restringe a
+    commits que tocam esses caminhos (relativos à raiz do repositório) e, nos fatos, aos
+    arquivos sob eles.
+    """
+    since: Optional[str] = None
+    until: Optional[str] = None
+    rev: str = "HEAD"
+    first_parent: bool = False
+    no_merges: bool = False
+    paths: Tuple[str, ...] = ()
+
+    @classmethod
+    def build(cls, since=None, until=None, rev=None, first_parent=False, no_merges=False, paths=()) -> "HistoryFilter":
+        """Normaliza a entrada da CLI/dashboard: caminhos com '/', sem './' nem '/' no fim, sem repetição."""
+        normalized = []
+        for path in paths or ():
+            path = path.strip().replace("\\", "/").strip("/")
+            while path.startswith("./"):
+                path = path[2:]
+            if path and path != "." and path not in normalized:
+                normalized.append(path)
+        return cls(since or None, until or None, rev or "HEAD", bool(first_parent), bool(no_merges), tuple(normalized))
+
+    def revision_args(self) -> List[str]:
+        """Opções de rev-list/log que escolhem os commits, seguidas da ponta percorrida."""
+        args = []
+        if self.since:
+            args.append(f"--since={self.since}")
+        if self.until:
+            args.append(f"--until={self.until}")
+        if self.first_parent:
+            args.append("--first-parent")
+        if self.no_merges:
+            args.append("--no-merges")
+        return args + [self.rev]
+
+    def pathspec(self) -> List[str]:
+        return ["--", *self.paths] if self.paths else []
+
+    def contains(self, path: Optional[str]) -> bool:
+        if not path:
+            return False
+        path = path.replace(os.sep, "/")
+        return any(path == scope or path.startswith(scope + "/") for scope in self.paths)
+
+    def scope(self, facts: CommitFacts, repo_path: str) -> CommitFacts:
+        """
+        Os mesmos fatos só com os arquivos sob `paths`, como o git veria com o pathspec (para
+        backends que não recortam o diff no git). Uma renomeação que cruza a fronteira do
+        recorte vira a remoção do caminho antigo (saindo) ou a adição do novo (entrando), com
+        as linhas do arquivo inteiro; nenhum caminho de fora aparece.
+        """
+        if not self.paths:
+            return facts
+        files = []
+        crossing = []
+        for change in facts.files:
+            old_in, new_in = self.contains(change.old_path), self.contains(change.new_path)
+            if change.old_path and change.new_path and old_in != new_in:
+                path = change.old_path if old_in else change.new_path
+                crossing.append((len(files), path, old_in))
+                files.append(None)
+            elif old_in or new_in:
+                files.append(change)
+        if crossing:
+            counts = _whole_file_counts(repo_path, facts.sha, [path for _, path, _ in crossing])
+            for index, path, leaving in crossing:
+                added, deleted = counts.get(path.replace(os.sep, "/"), (0, 0))
+                files[index] = FileChange(
+                    os.path.basename(path), path if leaving else None, None if leaving else path, added, deleted
+                )
+            # Sem o par da renomeação, o git devolve o diff em ordem de caminho
+            files.sort(key=lambda change: change.new_path or change.old_path)
+        return facts._replace(files=tuple(files))
+
+    def describe(self) -> str:
+        """Resumo legível do recorte ("" quando é o histórico inteiro a partir do HEAD)."""
+        parts = []
+        if self.rev != "HEAD":
+            parts.append(f"ref {self.rev}")
+        if self.since:
+            parts.append(f"desde {self.since}")
+        if self.until:
+            parts.append(f"até {self.until}")
+        if self.first_parent:
+            parts.append("first-parent")
+        if self.no_merges:
+            parts.append("sem merges")
+        if self.paths:
+            parts.append("em " + ", ".join(self.paths))
+        return " · ".join(parts)
+
+
+def facts_from_commit(commit) -> CommitFacts:
+    """
+    Converte um commit do PyDriller em CommitFacts. Em arquivos binários criados ou removidos
+    o GitPython preenche os dois caminhos; o lado que não existe vira None, como no git log.
+    """
+    files = tuple(
+        FileChange(
+            m.filename,
+            None if m.change_type.name == "ADD" else m.old_path,
+            None if m.change_type.name == "DELETE" else m.new_path,
+            m.added_lines, m.deleted_lines
+        )
+        for m in commit.modified_files
+    )
+    return CommitFacts(commit.hash, commit.author.name, int(commit.author_date.timestamp()), files)
+
+
+def run_git(repo_path: str, *args) -> str:
+    result = subprocess.run(
+        ["git", "-C", repo_path, *args],
+        capture_output=True, text=True, encoding="utf-8", errors="replace", check=True
+    )
+    return result.stdout
+
+
+def _whole_file_counts(repo_path: str, sha: str, paths) -> dict:
+    """{caminho: (adicionadas, removidas)} do diff do commit com o pai, sem detectar renomeações."""
+    output = run_git(repo_path, "diff", "--numstat", "-z", "--no-renames", f"{sha}^", sha, "--", *paths)
+    counts = {}
+    for entry in output.split("\0"):
+        if entry.strip("\n"):
+            added, deleted, path = entry.strip("\n").split("\t", 2)
+            counts[path] = (int(added) if added != "-" else 0, int(deleted) if deleted != "-" else 0)
+    return counts
+
+
+def rev_list(repo_path: str, limit: int, rev: str = "HEAD", history: HistoryFilter = None) -> List[str]:
+    """
+    SHAs dos últimos `limit` commits, na mesma ordem do PyDriller com order='reverse'.
+    Com `history`, o próprio git aplica o recorte (datas, ponta, merges, caminhos).
+    Repositório sem commits retorna lista vazia.
+    """
+    selection = history.revision_args() + history.pathspec() if history else [rev]
+    try:
+        output = run_git(repo_path, "rev-list", f"--max-count={limit}", *selection)
+    except subprocess.CalledProcessError:
+        return []
+    return output.split()
+
+
+def head_sha(repo_path: str, rev: str = "HEAD") -> Optional[str]:
+    """SHA para o qual `rev` aponta agora, ou None (não é repositório ou não há commits)."""
+    try:
+        return run_git(repo_path, "rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}").strip() or None
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+# Cabeçalho de cada commit no `git log`: \x1e separa commits, \x1f separa campos
+LOG_FORMAT = "%x1e%H%x1f%an%x1f%at"
+
+
+def _iter_nul_tokens(stream, chunk_size: int = 1 << 16):
+    """Lê a saída de `git log -z` em blocos, devolvendo um campo por vez sem carregar tudo na memória."""
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        parts = (pending + chunk).split(b"\0")
+        pending = parts.pop()
+        for part in parts:
+            yield part.decode("utf-8", errors="replace")
+    if pending:
+        yield pending.decode("utf-8", errors="replace")
+
+
+def parse_numstat(tokens):
+    """
+    Converte os campos de `git log --raw --numstat -z --format=LOG_FORMAT` em CommitFacts.
+    O bloco --raw traz o tipo da mudança (A/D/M/R...) e os caminhos; o --numstat, na mesma
+    ordem, traz as linhas adicionadas/removidas. Renomeações ocupam dois caminhos em ambos.
+    """
+    header = None
+    raw_entries = []
+    counts = []
+    tokens = iter(tokens)
+
+    def build_facts():
+        files = tuple(
+            FileChange(os.path.basename(new_path or old_path), old_path, new_path, added, deleted)
+            for (old_path, new_path), (added, deleted) in zip(raw_entries, counts)
+        )
+        return CommitFacts(*header, files)
+
+    for token in tokens:
+        if token.startswith("\n"):
+            token = token[1:]
+        if not token:
+            continue
+
+        if token.startswith("\x1e"):
+            if header:
+                yield build_facts()
+            sha, author, timestamp = token[1:].split("\x1f")
+            header = (sha, author, int(timestamp))
+            raw_entries = []
+            counts = []
+        elif token.startswith(":"):
+            status = token.rsplit(" ", 1)[1][0]
+            path = os.path.normpath(next(tokens))
+            if status in ("R", "C"):
+                raw_entries.append((path, os.path.normpath(next(tokens))))
+            elif status == "A":
+                raw_entries.append((None, path))
+            elif status == "D":
+                raw_entries.append((path, None))
+            else:
+                raw_entries.append((path, path))
+        else:
+            added, deleted, path = token.split("\t", 2)
+            if not path:
+                # Renomeação: caminho antigo e novo vêm nos dois campos seguintes
+                next(tokens)
+                next(tokens)
+            counts.append((
+                int(added) if added != "-" else 0,
+                int(deleted) if deleted != "-" else 0
+            ))
+
+    if header:
+        yield build_facts()
+
+
+def iter_numstat_facts(repo_path: str, limit: int = None, shas: List[str] = None, history: HistoryFilter = None):
+    """
+    Gera CommitFacts direto do `git log --numstat`, sem materializar diffs.
+    Com `shas`, lê só esses commits (na ordem dada); senão, os últimos `limit` a partir do
+    HEAD ou do recorte `history`. Com caminhos no recorte, o git só calcula o diff deles.
+    """
+    history = history or HistoryFilter()
+    args = ["git", "-C", repo_path, "log", "-M", "--raw", "--numstat", "-z", f"--format={LOG_FORMAT}"]
+    if shas is not None:
+        if not shas:
+            return
+        # --full-history: com caminhos, o git não descarta nenhum dos commits pedidos
+        args += ["--no-walk=unsorted", "--stdin"] + (["--full-history"] if history.paths else [])
+    else:
+        args += [f"--max-count={limit}", *history.revision_args()]
+        if history.first_parent:
+            # --first-parent passaria a mostrar o diff dos merges; eles continuam sem arquivos, como nos outros caminhos
+            args.append("--no-diff-merges")
+    args += history.pathspec()
+
+    process = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE if shas is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        if shas is not None:
+            # O git lê todas as revisões antes de escrever qualquer saída
+            process.stdin.write("\n".join(shas).encode() + b"\n")
+            process.stdin.close()
+        yield from parse_numstat(_iter_nul_tokens(process.stdout))
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+class BlobReader:
+    """
+    Lê blobs de qualquer revisão sem checkout, por processos `git cat-file` de longa duração:
+    um `--batch-check` (só SHA e tamanho) e um `--batch` (conteúdo). Os pedidos de uma
+    chamada vão todos de uma vez, então ler centenas de revisões não custa um processo por arquivo.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self._check = self._spawn("--batch-check")
+        self._batch = self._spawn("--batch")
+
+    def _spawn(self, mode: str):
+        return subprocess.Popen(
+            ["git", "-C", self.repo_path, "cat-file", mode],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+
+    def _request(self, process, specs, read_body: bool):
+        specs = list(specs)
+        if not specs:
+            return {}
+
+        # Os pedidos são escritos por outra thread enquanto esta lê as respostas: se o git encher o
+        # pipe de saída (blobs grandes, ou o buffer de ~4 KB do Windows), ele para de ler a entrada,
+        # e escrever e ler na mesma thread travaria os dois processos
+        failure = []
+
+        def write_requests():
+            try:
+                process.stdin.write(b"".join(spec.encode("utf-8") + b"\n" for spec in specs))
+                process.stdin.flush()
+            except OSError as e:
+                failure.append(e)
+
+        writer = threading.Thread(target=write_requests, name="cat-file-writer", daemon=True)
+        writer.start()
+        results = {}
+        try:
+            for spec in specs:
+                header = process.stdout.readline().decode("utf-8", errors="replace").rstrip("\n")
+                parts = header.split(" ")
+                if len(parts) != 3 or not parts[2].isdigit():
+                    # "<spec> missing" / "<spec> ambiguous": caminho não existe nessa revisão
+                    if not header and failure:
+                        raise failure[0]
+                    results[spec] = None
+                    continue
+                sha, kind, size = parts[0], parts[1], int(parts[2])
+                body = None
+                if read_body:
+                    body = process.stdout.read(size)
+                    process.stdout.read(1)
+                results[spec] = (sha, size, body) if kind == "blob" else None
+        finally:
+            writer.join()
+        return results
+
+    def info_many(self, specs):
+        """{spec: (blob_sha, tamanho) ou None} para specs no formato "<commit>:<caminho>"."""
+        return {
+            spec: (info[0], info[1]) if info else None
+            for spec, info in self._request(self._check, specs, read_body=False).items()
+        }
+
+    def read_many(self, specs):
+        """{spec: conteúdo em bytes ou None} para specs no formato "<commit>:<caminho>"."""
+        return {
+            spec: info[2] if info else None
+            for spec, info in self._request(self._batch, specs, read_body=True).items()
+        }
+
+    def close(self):
+        for process in (self._check, self._batch):
+            process.stdin.close()
+            process.stdout.close()
+            process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
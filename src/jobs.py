@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class BackgroundJob:
+    """
+    Executa `target(job)` numa thread própria. O alvo publica resultados parciais com
+    `job.publish(...)` e consulta `job.should_stop()` para atender a um cancelamento.
+    Quem acompanha o job só lê `state`, `partial`, `result` e `error`; nada aqui bloqueia.
+    """
+
+    def __init__(self, target):
+        self.state = "running"
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(target,), name="background-job", daemon=True)
+        self._thread.start()
+
+    def _run(self, target):
+        try:
+            self.result = target(self)
+            self.state = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "error"
+        finally:
+            self.finished = time.time()
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    def publish(self, partial):
+        self.partial = partial
+
+    def should_stop(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Espera o job terminar por até `timeout` segundos; retorna True se terminou."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+
+class JobRegistry:
+    """
+    Um job por chave (single-flight): pedidos iguais enquanto o job roda recebem o mesmo
+    job, em vez de começar outro. Jobs cancelados ou com erro são substituídos no próximo
+    pedido; dos concluídos, só os `max_finished` mais recentes são mantidos.
+    """
+
+    def __init__(self, max_finished: int = 32):
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._jobs.get(key)
+
+    def get_or_start(self, key, target) -> BackgroundJob:
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.state in ("cancelled", "error"):
+                job = self._jobs[key] = BackgroundJob(target)
+                self._prune()
+            return job
+
+    def _prune(self):
+        finished = sorted(
+            (job.finished, key) for key, job in self._jobs.items() if job.finished is not None
+        )
+        for _, key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[key]
+
+    def running(self):
+        return {key: job for key, job in self._jobs.items() if job.running}
+
+    def clear(self):
+        """Cancela os jobs em andamento e esquece todos."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+            self._jobs.clear()
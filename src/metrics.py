@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+# Arquivos em que um único autor fez mais que esta fração das mudanças contam no Bus Factor
+BUS_FACTOR_SHARE = 0.8
+
+COLUMNS = [
+    "file", "churn", "complexity", "risk_score", "changes", "author_count",
+    "top_author", "top_author_changes", "second_author", "second_author_changes",
+    "top_author_share", "bus_factor_risk", "authors_display",
+]
+
+
+# Quem fez ao menos esta fração das mudanças de um arquivo (ou é o principal autor) conhece o arquivo no Truck Factor
+KNOWLEDGE_SHARE = 0.25
+# O Truck Factor é o menor grupo de pessoas cuja saída deixa mais que esta fração dos arquivos sem ninguém que os conheça
+ORPHAN_SHARE = 0.5
+
+
+class AuthorDistribution:
+    """
+    Autoria completa de cada arquivo em formato CSR: os autores da linha `r` (IDs
+    internados) ocupam `authors[indptr[r]:indptr[r + 1]]`, com quantos commits de cada
+    um tocaram o arquivo em `changes`, do que mais mudou para o que menos mudou.
+    """
+
+    def __init__(self, author_names, indptr, authors, changes):
+        self.author_names = author_names
+        self.indptr = indptr
+        self.authors = authors
+        self.changes = changes
+
+    @classmethod
+    def from_long(cls, n_rows: int, author_names, rows, authors, changes, order=None) -> "AuthorDistribution":
+        """
+        A partir de autorias em formato longo: `rows[i]` é a linha do arquivo, `authors[i]`
+        o autor e `changes[i]` quantos commits dele tocaram o arquivo. Empates ficam na
+        ordem de `order` (padrão: a ordem recebida).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        authors = np.asarray(authors, dtype=np.int64)
+        changes = np.asarray(changes, dtype=np.int64)
+        order = np.arange(len(rows)) if order is None else np.asarray(order)
+        sort = np.lexsort((order, -changes, rows))
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(author_names, indptr, authors[sort], changes[sort])
+
+    @classmethod
+    def from_changes(cls, n_rows: int, author_names, file_ids, author_ids) -> "AuthorDistribution":
+        """Conta as alterações (`file_ids[i]` mudou num commit de `author_ids[i]`); empates pela primeira alteração vista."""
+        keys = (np.asarray(file_ids, dtype=np.int64) << 32) | np.asarray(author_ids, dtype=np.int64)
+        keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        return cls.from_long(n_rows, author_names, keys >> 32, keys & 0xFFFFFFFF, counts, first)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def rows(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+    def totals(self) -> np.ndarray:
+        """Mudanças por arquivo, somando todos os autores."""
+        return np.bincount(self.rows, weights=self.changes, minlength=len(self)).astype(np.int64)
+
+    def ranks(self) -> np.ndarray:
+        """Posição de cada autoria dentro do seu arquivo (0 = principal autor)."""
+        return np.arange(len(self.authors)) - np.repeat(self.indptr[:-1], np.diff(self.indptr))
+
+    def shares(self) -> np.ndarray:
+        """Fração das mudanças do arquivo feita por cada autoria."""
+        return self.changes / np.maximum(self.totals(), 1)[self.rows]
+
+
+def build_metrics_frame(files, churn, complexity, authors: AuthorDistribution):
+    """
+    Métricas por arquivo em colunas, uma linha por arquivo.
+
+    `files`, `churn` e `complexity` são alinhados (posição = linha); `authors` traz a
+    autoria completa das mesmas linhas. O compartilhamento do principal autor é
+    calculado sobre todas as mudanças do arquivo, não só as dos dois primeiros.
+    """
+    frame = pd.DataFrame({
+        "file": pd.Series(files, dtype=object),
+        "churn": np.asarray(churn, dtype=np.int64),
+        "complexity": np.asarray(complexity, dtype=np.int64),
+    })
+    frame["risk_score"] = frame["churn"] * frame["complexity"]
+
+    rows = authors.rows
+    rank = authors.ranks()
+    names = np.asarray(authors.author_names, dtype=object)
+
+    frame["changes"] = authors.totals()
+    frame["author_count"] = np.diff(authors.indptr)
+    for prefix, position in (("top", 0), ("second", 1)):
+        selected = rank == position
+        column = np.full(len(frame), None, dtype=object)
+        column[rows[selected]] = names[authors.authors[selected]]
+        counts = np.zeros(len(frame), dtype=np.int64)
+        counts[rows[selected]] = authors.changes[selected]
+        frame[f"{prefix}_author"] = pd.Series(column, index=frame.index, dtype=object)
+        frame[f"{prefix}_author_changes"] = counts
+
+    frame["top_author_share"] = np.where(frame["changes"] > 0, frame["top_author_changes"] / frame["changes"].clip(lower=1), 0.0)
+    frame["bus_factor_risk"] = frame["top_author_share"] > BUS_FACTOR_SHARE
+
+    display = frame["top_author"].astype(str) + " (" + frame["top_author_changes"].astype(str) + ")"
+    second = ", " + frame["second_author"].astype(str) + " (" + frame["second_author_changes"].astype(str) + ")"
+    display = display.where(frame["second_author"].isna(), display + second)
+    frame["authors_display"] = display.where(frame["top_author"].notna(), "N/A").astype(object)
+    return frame[COLUMNS]
+
+
+def truck_factor(authors: AuthorDistribution, knowledge_share: float = KNOWLEDGE_SHARE,
+                 orphan_share: float = ORPHAN_SHARE):
+    """
+    Truck Factor do repositório: quantas pessoas precisam sair para que mais de
+    `orphan_share` dos arquivos fiquem órfãos (sem ninguém que os conheça).
+
+    Remoção gulosa: sai primeiro quem deixaria mais arquivos órfãos na hora (empate: quem
+    conhece mais arquivos). Cada arquivo guarda quantos conhecedores ainda restam e cada
+    pessoa quantos arquivos conhece sozinha; a saída de alguém só atualiza os arquivos
+    dela, sem varrer o repositório de novo.
+    """
+    n_files = len(authors)
+    n_authors = len(authors.author_names)
+    known = (authors.shares() >= knowledge_share) | (authors.ranks() == 0)
+    file_of = authors.rows[known]
+    author_of = authors.authors[known]
+
+    # As mesmas autorias em CSR por arquivo (já estão nessa ordem) e por autor
+    file_ptr = np.zeros(n_files + 1, dtype=np.int64)
+    np.cumsum(np.bincount(file_of, minlength=n_files), out=file_ptr[1:])
+    degree = np.bincount(author_of, minlength=n_authors)
+    author_ptr = np.zeros(n_authors + 1, dtype=np.int64)
+    np.cumsum(degree, out=author_ptr[1:])
+    files_by_author = file_of[np.argsort(author_of, kind="stable")]
+
+    remaining = np.bincount(file_of, minlength=n_files)
+    alone = np.bincount(author_of[remaining[file_of] == 1], minlength=n_authors)
+    removed = np.zeros(n_authors, dtype=bool)
+    # Ordem lexicográfica (sozinho, conhecidos) num único inteiro; quem já saiu fica com -1
+    scale = int(degree.max(initial=0)) + 1
+    order = []
+    orphaned = 0
+    while orphaned <= orphan_share * n_files and len(order) < n_authors:
+        author = int(np.argmax(np.where(removed, -1, alone * scale + degree)))
+        removed[author] = True
+        order.append(author)
+
+        touched = files_by_author[author_ptr[author]:author_ptr[author + 1]]
+        remaining[touched] -= 1
+        orphaned += int(np.count_nonzero(remaining[touched] == 0))
+        # Arquivos que ficaram com um só conhecedor: ele passa a conhecê-los sozinho
+        single = touched[remaining[touched] == 1]
+        if len(single):
+            starts, sizes = file_ptr[single], file_ptr[single + 1] - file_ptr[single]
+            offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            candidates = author_of[np.repeat(starts, sizes) + offsets]
+            alone += np.bincount(candidates[~removed[candidates]], minlength=n_authors)
+
+    return {
+        "truck_factor": len(order),
+        "authors": [authors.author_names[author] for author in order],
+        "orphaned_files": orphaned,
+        "total_files": n_files,
+    }
+
+
+def rank_by_risk(frame, n: int = None):
+    """Linhas em ordem decrescente de risco (empates pelo nome do arquivo); as `n` primeiras, se dado."""
+    ranked = frame.sort_values(["risk_score", "file"], ascending=[False, True], kind="stable")
+    return ranked if n is None else ranked.head(n)
+
+
+def hotspot_records(frame, n: int = 10):
+    """
+    Os `n` maiores hotspots no formato de dicionário do collect_metrics: `top_authors` com os
+    dois principais autores e `top_author`/`top_author_share`, as mesmas colunas que o
+    dashboard envia para a IA.
+    """
+    records = []
+    for row in rank_by_risk(frame, n).itertuples(index=False):
+        top_authors = {}
+        if pd.notna(row.top_author):
+            top_authors[row.top_author] = int(row.top_author_changes)
+        if pd.notna(row.second_author):
+            top_authors[row.second_author] = int(row.second_author_changes)
+        records.append({
+            "file": row.file,
+            "churn": int(row.churn),
+            "complexity": int(row.complexity),
+            "risk_score": int(row.risk_score),
+            "top_authors": top_authors,
+            "top_author": row.top_author if pd.notna(row.top_author) else None,
+            "top_author_share": round(float(row.top_author_share), 3),
+        })
+    return records
+
+
+def calculate_kpis(frame):
+    """KPIs principais: total de arquivos, risco médio e arquivos com Bus Factor em risco."""
+    total_files = len(frame)
+    avg_risk = float(frame["risk_score"].mean()) if total_files else 0.0
+    bus_factor = int(frame["bus_factor_risk"].sum())
+    return total_files, avg_risk, bus_factor
@@ -0,0 +1,72 @@
+import os
+import subprocess
+from collections import defaultdict
+
+from .history import FileChange, run_git
+
+
+class PathIndex:
+    """
+    Índice de caminhos montado uma vez por análise.
+
+    Os commits chegam do mais novo para o mais antigo, então cada renomeação vista
+    aponta o caminho antigo para o caminho atual do arquivo. Assim o histórico inteiro
+    de um arquivo renomeado fica sob a mesma chave (caminho relativo ao repositório),
+    e arquivos homônimos em pastas diferentes não se misturam.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self.aliases = {}
+        self.events = defaultdict(list)
+        self._tracked = None
+
+    def resolve(self, change: FileChange, position: int = None) -> str:
+        """
+        Chave (caminho atual, relativo ao repositório) do arquivo tocado por `change`.
+        `position` é o índice do commit na janela (0 = mais novo); com ele, criações,
+        remoções e renomeações ficam registradas para o path_at.
+        """
+        if change.new_path is None:
+            key = self.aliases.get(change.old_path, change.old_path)
+        else:
+            key = self.aliases.get(change.new_path, change.new_path)
+            if change.old_path and change.old_path != change.new_path:
+                # Antes desta renomeação, o caminho novo pertencia a outro arquivo (ou a nenhum)
+                self.aliases.pop(change.new_path, None)
+                self.aliases[change.old_path] = key
+
+        if position is not None and change.old_path != change.new_path:
+            self.events[key].append((position, change.old_path, change.new_path))
+        return key
+
+    def path_at(self, key: str, position: int):
+        """Caminho do arquivo `key` logo após o commit `position` da janela, ou None se ele não existia."""
+        events = self.events.get(key)
+        if not events:
+            return key
+        # Eventos estão do mais novo (posição menor) para o mais antigo
+        newer = None
+        for event_position, old_path, new_path in events:
+            if event_position >= position:
+                return new_path
+            newer = old_path
+        return newer
+
+    @property
+    def tracked(self):
+        """Arquivos versionados na árvore de trabalho, lidos uma única vez via `git ls-files`."""
+        if self._tracked is None:
+            try:
+                output = run_git(self.repo_path, "ls-files", "-z")
+                self._tracked = {os.path.normpath(path) for path in output.split("\0") if path}
+            except (subprocess.CalledProcessError, OSError):
+                self._tracked = False
+        return self._tracked
+
+    def locate(self, key: str):
+        """Caminho absoluto do arquivo na árvore de trabalho, ou None se ele não existe mais."""
+        if self.tracked is not False and key not in self.tracked:
+            return None
+        full_path = os.path.join(self.repo_path, key)
+        return full_path if os.path.isfile(full_path) else None
@@ -0,0 +1,117 @@
+import json
+import math
+import re
+
+# Colunas usadas para ordenar as linhas de cada tabela: as últimas são as primeiras a sair
+RANK_COLUMNS = ("risk_score", "shared_commits", "churn")
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa local de tokens, sem chamar a API: cada pontuação conta um token e cada
+    palavra conta um a cada 4 caracteres (regra aproximada dos tokenizadores BPE).
+    """
+    return sum(
+        math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == "_" else 1
+        for piece in _TOKEN_PATTERN.findall(text)
+    )
+
+
+def _cell(value) -> str:
+    if isinstance(value, dict):
+        return ";".join(f"{k}:{_cell(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return ";".join(_cell(v) for v in value)
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _is_table(value) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+def _rank_column(columns):
+    return next((column for column in RANK_COLUMNS if column in columns), None)
+
+
+def _summary(columns, rows) -> str:
+    """Nota que substitui as linhas cortadas: quantas eram e o maior valor da coluna de ranking."""
+    note = f"(+{len(rows)} linhas de menor risco omitidas"
+    rank = _rank_column(columns)
+    if rank:
+        note += f"; {rank} máx {_cell(max(row.get(rank) or 0 for row in rows))}"
+    return note + ")"
+
+
+def _render(scalars, tables, dropped) -> str:
+    lines = [f"{key}: {_cell(value)}" for key, value in scalars]
+    for name, columns, rows in tables:
+        lines.append(f"[{name}] {'|'.join(columns)}")
+        lines.extend("|".join(_cell(row.get(column, "")) for column in columns) for row in rows)
+        if dropped.get(name):
+            lines.append(_summary(columns, dropped[name]))
+    return "\n".join(lines)
+
+
+def encode_payload(metrics_data, token_budget: int = None):
+    """
+    Codifica os dados para o prompt em forma tabular: escalares como "chave: valor" e cada
+    lista de registros como uma tabela (cabeçalho uma vez, uma linha por registro, colunas
+    separadas por "|"). Se passar de `token_budget`, remove as linhas de menor risco da
+    maior tabela até caber, deixando no lugar uma nota com quantas saíram.
+
+    Retorna (texto, estatísticas) comparando com o JSON indentado usado antes.
+    """
+    if not isinstance(metrics_data, dict):
+        metrics_data = {"dados": metrics_data}
+
+    scalars = []
+    tables = []
+    for key, value in metrics_data.items():
+        if _is_table(value):
+            columns = list(dict.fromkeys(column for row in value for column in row))
+            rank = _rank_column(columns)
+            rows = sorted(value, key=lambda row: row.get(rank) or 0, reverse=True) if rank else list(value)
+            tables.append((key, columns, rows))
+        else:
+            scalars.append((key, value))
+
+    dropped = {}
+    text = _render(scalars, tables, dropped)
+    tokens = estimate_tokens(text)
+    while token_budget and tokens > token_budget:
+        # Corta sempre da maior tabela, mantendo ao menos uma linha em cada
+        name, columns, rows = max(tables, key=lambda table: len(table[2]), default=(None, None, []))
+        if len(rows) <= 1:
+            break
+        dropped.setdefault(name, []).append(rows.pop())
+        text = _render(scalars, tables, dropped)
+        tokens = estimate_tokens(text)
+
+    baseline = json.dumps(metrics_data, indent=2, default=str)
+    baseline_tokens = estimate_tokens(baseline)
+    stats = {
+        "json_bytes": len(baseline.encode("utf-8")),
+        "compact_bytes": len(text.encode("utf-8")),
+        "json_tokens": baseline_tokens,
+        "compact_tokens": tokens,
+        "rows_dropped": sum(len(rows) for rows in dropped.values()),
+        "token_budget": token_budget,
+    }
+    stats["bytes_saved"] = stats["json_bytes"] - stats["compact_bytes"]
+    stats["tokens_saved"] = baseline_tokens - tokens
+    return text, stats
+
+
+def describe_savings(stats) -> str:
+    """Resumo de uma linha das estatísticas de encode_payload."""
+    summary = (
+        f"Dados enviados à IA: {stats['compact_bytes']:,} bytes (~{stats['compact_tokens']:,} tokens), "
+        f"{stats['bytes_saved']:,} bytes e ~{stats['tokens_saved']:,} tokens a menos que o JSON"
+    )
+    if stats["rows_dropped"]:
+        summary += f"; {stats['rows_dropped']} linhas de menor risco resumidas (orçamento: {stats['token_budget']:,} tokens)"
+    return summary
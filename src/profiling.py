@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+_NULL_SPAN = nullcontext()
+
+
+class Profiler:
+    """
+    Medição leve de tempo por etapa da análise.
+
+    - `span(nome)` registra um intervalo (aparece no resumo e no trace do Chrome).
+    - `add(nome, segundos)` soma tempo de etapas de laço quente (por arquivo, por commit)
+      sem criar um evento por chamada; aparece só no resumo.
+    - `count(nome)` acumula contadores (commits, arquivos, acertos de cache...).
+
+    Desligado, `span` devolve sempre o mesmo contexto vazio e `add`/`count` retornam
+    na hora; os laços quentes testam `profiler.enabled` antes de medir.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.events = []
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start)
+
+    def span(self, name: str):
+        return self._span(name) if self.enabled else _NULL_SPAN
+
+    def record(self, name: str, start: float, duration: float):
+        """Registra um intervalo já medido (útil em código assíncrono ou geradores)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.events.append((name, start, duration, threading.get_ident()))
+            self.totals[name] += duration
+            self.calls[name] += 1
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.totals[name] += seconds
+            self.calls[name] += calls
+
+    def timed_iter(self, name: str, iterable):
+        """Repassa os itens de `iterable`, somando em `name` o tempo gasto esperando cada um."""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iter(iterable))
+
+    def _timed_iter(self, name: str, iterator):
+        clock = time.perf_counter
+        total = 0.0
+        calls = 0
+        try:
+            while True:
+                started = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    total += clock() - started
+                calls += 1
+                yield item
+        finally:
+            self.add(name, total, calls)
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def summary(self):
+        """Etapas ordenadas pelo tempo total, com chamadas, média e fração do tempo desde a criação."""
+        wall = time.perf_counter() - self.origin
+        return [
+            {
+                "stage": name,
+                "calls": self.calls[name],
+                "total": round(total, 6),
+                "mean": round(total / self.calls[name], 6) if self.calls[name] else 0.0,
+                "share": round(total / wall, 4) if wall > 0 else 0.0,
+            }
+            for name, total in sorted(self.totals.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+    def chrome_trace(self):
+        """Eventos no formato Trace Event do Chrome (abrir em chrome://tracing ou ui.perfetto.dev)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, duration, tid in self.events
+        ]
+        if self.counters:
+            end = max((event["ts"] + event["dur"] for event in events), default=0)
+            events.append({"name": "contadores", "ph": "C", "ts": end, "pid": pid, "args": dict(self.counters)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def report(self):
+        """Resumo serializável: etapas e contadores."""
+        return {"stages": self.summary(), "counters": dict(self.counters)}
+
+
+# Profiler padrão de quem não pede medição: desligado, custo praticamente zero
+DISABLED = Profiler(enabled=False)
@@ -0,0 +1,204 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from .collector import GitCollector
+from .coupling import CoChangeMatrix, Interner
+from .metrics import AuthorDistribution
+from .timeline import Activity
+
+SNAPSHOT_VERSION = 1
+FORMATS = ("arrow", "parquet")
+MANIFEST = "snapshot.json"
+EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+def _commit_tables(window):
+    """Uma linha por commit e uma por arquivo alterado em cada commit (`commit` = posição na janela)."""
+    commits = {"sha": [], "author": [], "timestamp": [], "files": [], "added": [], "deleted": []}
+    changes = {"commit": [], "filename": [], "old_path": [], "new_path": [], "added": [], "deleted": []}
+    for position, facts in enumerate(window):
+        added = deleted = 0
+        for change in facts.files:
+            changes["commit"].append(position)
+            changes["filename"].append(change.filename)
+            changes["old_path"].append(change.old_path)
+            changes["new_path"].append(change.new_path)
+            changes["added"].append(change.added)
+            changes["deleted"].append(change.deleted)
+            added += change.added
+            deleted += change.deleted
+        commits["sha"].append(facts.sha)
+        commits["author"].append(facts.author)
+        commits["timestamp"].append(facts.timestamp)
+        commits["files"].append(len(facts.files))
+        commits["added"].append(added)
+        commits["deleted"].append(deleted)
+
+    schema_commits = pa.schema([("sha", pa.string()), ("author", pa.string()), ("timestamp", pa.int64()),
+                                ("files", pa.int32()), ("added", pa.int64()), ("deleted", pa.int64())])
+    schema_changes = pa.schema([("commit", pa.int32()), ("filename", pa.string()), ("old_path", pa.string()),
+                                ("new_path", pa.string()), ("added", pa.int64()), ("deleted", pa.int64())])
+    return pa.table(commits, schema=schema_commits), pa.table(changes, schema=schema_changes)
+
+
+def _coupling_table(coupling_data):
+    """Todos os pares que já mudaram juntos, com os arquivos em ordem alfabética como em get_coupling_analysis."""
+    first, second = coupling_data.pair_ids()
+    names = np.asarray(coupling_data.files.names, dtype=object)
+    file_a, file_b = names[first], names[second]
+    swap = file_a > file_b if len(file_a) else np.zeros(0, dtype=bool)
+    file_a, file_b = np.where(swap, file_b, file_a), np.where(swap, file_a, file_b)
+    return pa.table({
+        "file_a": pa.array(file_a, type=pa.string()),
+        "file_b": pa.array(file_b, type=pa.string()),
+        "shared_commits": pa.array(coupling_data.counts, type=pa.int64()),
+    })
+
+
+def _authors_table(distribution: AuthorDistribution):
+    """Autoria completa em formato longo (`row` = linha em `files`), do principal autor de cada arquivo para o menor."""
+    names = pa.array(distribution.author_names, type=pa.string())
+    return pa.table({
+        "row": pa.array(distribution.rows, type=pa.int32()),
+        "author": pa.DictionaryArray.from_arrays(pa.array(distribution.authors, type=pa.int32()), names),
+        "changes": pa.array(distribution.changes, type=pa.int64()),
+    })
+
+
+def _activity_table(activity: Activity):
+    """Churn e alterações por (arquivo, dia, autor); `row` = linha em `files`, `day` = dias desde 01/01/1970."""
+    names = pa.array(activity.author_names, type=pa.string())
+    return pa.table({
+        "row": pa.array(activity.rows, type=pa.int32()),
+        "day": pa.array(activity.days, type=pa.int32()),
+        "author": pa.DictionaryArray.from_arrays(pa.array(activity.authors, type=pa.int32()), names),
+        "churn": pa.array(activity.churn, type=pa.int64()),
+        "commits": pa.array(activity.commits, type=pa.int32()),
+    })
+
+
+def _write_table(table, path: str, fmt: str):
+    # Arrow IPC sem compressão: ao abrir, as colunas são mapeadas do disco em vez de copiadas
+    if fmt == "arrow":
+        feather.write_feather(table, path, compression="uncompressed")
+    else:
+        pq.write_table(table, path)
+
+
+def write_snapshot(collector: GitCollector, path: str, fmt: str = "arrow", trends=None):
+    """
+    Grava as métricas de uma análise concluída numa pasta: `files` (uma linha por
+    arquivo, as mesmas colunas de `collector.file_metrics`), `commits`, `changes`
+    (arquivo alterado por commit), `coupling` (todos os pares de co-alteração),
+    `authors` (commits de cada autor em cada arquivo) e `activity` (churn por arquivo,
+    dia e autor), mais o manifesto `snapshot.json`. O manifesto é escrito por último:
+    uma pasta sem ele está incompleta e não abre.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconhecido: {fmt}. Opções: {', '.join(FORMATS)}")
+    if collector.file_metrics is None:
+        raise ValueError("A análise ainda não terminou: não há métricas para gravar")
+
+    os.makedirs(path, exist_ok=True)
+    commits, changes = _commit_tables(collector.window)
+    tables = {
+        "files": pa.Table.from_pandas(collector.file_metrics, preserve_index=False),
+        "commits": commits,
+        "changes": changes,
+        "coupling": _coupling_table(collector.coupling_data),
+        "authors": _authors_table(collector.author_distribution),
+        "activity": _activity_table(collector.get_activity()),
+    }
+    files = {}
+    for name, table in tables.items():
+        files[name] = name + EXTENSIONS[fmt]
+        _write_table(table, os.path.join(path, files[name]), fmt)
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "format": fmt,
+        "repo_path": os.path.abspath(collector.repo_path),
+        "head": collector.window[0].sha if collector.window else None,
+        "backend": collector.backend,
+        "commits_analyzed": collector.total_commits_analyzed,
+        "history": collector.history._asdict(),
+        "created_at": int(time.time()),
+        "tables": files,
+        "rows": {name: table.num_rows for name, table in tables.items()},
+        "trends": trends,
+    }
+    temp_path = os.path.join(path, MANIFEST + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_path, os.path.join(path, MANIFEST))
+    return manifest
+
+
+def read_manifest(path: str):
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"'{path}' não contém um snapshot ({MANIFEST} ausente)")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot na versão {manifest.get('version')}; esta versão lê apenas a {SNAPSHOT_VERSION}")
+    return manifest
+
+
+def read_table(path: str, manifest, name: str) -> pa.Table:
+    """Tabela `name` do snapshot. Arrow IPC é mapeado em memória; Parquet é lido (e descomprimido) por inteiro."""
+    table_path = os.path.join(path, manifest["tables"][name])
+    if manifest["format"] == "arrow":
+        return feather.read_table(table_path, memory_map=True)
+    return pq.read_table(table_path, memory_map=True)
+
+
+def load_collector(path: str):
+    """
+    Reconstrói, sem git, o estado de um GitCollector ao fim da análise gravada: métricas
+    por arquivo, matriz de co-alterações, autoria, atividade diária e total de commits.
+    get_coupling_analysis, get_logical_coupling, get_truck_factor e get_activity
+    funcionam normalmente; o que depende do repositório (minerar de novo, tendência de
+    complexidade) não. Retorna (collector, manifest).
+    """
+    manifest = read_manifest(path)
+    file_metrics = read_table(path, manifest, "files").to_pandas()
+    coupling = read_table(path, manifest, "coupling")
+
+    # As linhas de `files` estão na ordem dos IDs da análise original: os IDs se repetem
+    # aqui, e os empates entre pares são desfeitos do mesmo jeito
+    files = Interner.from_names(file_metrics["file"].tolist())
+    file_a = pd.Series(coupling.column("file_a").to_numpy(zero_copy_only=False)).map(files.ids).to_numpy(np.int64)
+    file_b = pd.Series(coupling.column("file_b").to_numpy(zero_copy_only=False)).map(files.ids).to_numpy(np.int64)
+    keys = (np.minimum(file_a, file_b) << 32) | np.maximum(file_a, file_b)
+
+    collector = GitCollector(manifest["repo_path"], limit_commits=manifest["commits_analyzed"], use_cache=False,
+                             backend=manifest["backend"])
+    collector.coupling_data = CoChangeMatrix.from_counts(files, keys, coupling.column("shared_commits").to_numpy())
+    collector.total_commits_analyzed = manifest["commits_analyzed"]
+    collector.file_metrics = file_metrics
+    # Snapshots gravados antes das tabelas `authors` e `activity` abrem sem Truck Factor e sem séries por período
+    if "authors" in manifest["tables"]:
+        authors = read_table(path, manifest, "authors")
+        author = authors.column("author").combine_chunks()
+        collector.author_distribution = AuthorDistribution.from_long(
+            len(file_metrics), author.dictionary.to_pylist(), authors.column("row").to_numpy(),
+            author.indices.to_numpy(zero_copy_only=False), authors.column("changes").to_numpy()
+        )
+    if "activity" in manifest["tables"]:
+        activity = read_table(path, manifest, "activity")
+        author = activity.column("author").combine_chunks()
+        collector.activity = Activity(
+            file_metrics["file"].tolist(), author.dictionary.to_pylist(),
+            activity.column("row").to_numpy().astype(np.int64), activity.column("day").to_numpy().astype(np.int64),
+            author.indices.to_numpy(zero_copy_only=False).astype(np.int64),
+            activity.column("churn").to_numpy(), activity.column("commits").to_numpy().astype(np.int64),
+        )
+    return collector, manifest
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+DAY = 86400
+# Tamanho de cada período em dias. Semanas começam na segunda-feira (UTC)
+BUCKETS = {"day": 1, "week": 7}
+# 01/01/1970 foi uma quinta: somando 3 dias, as semanas viram na segunda
+_WEEK_SHIFT = 3
+
+
+def _group_starts(*columns) -> np.ndarray:
+    """Início de cada grupo de linhas consecutivas iguais em todas as colunas (já ordenadas)."""
+    if not len(columns[0]):
+        return np.empty(0, dtype=np.int64)
+    changed = np.zeros(len(columns[0]), dtype=bool)
+    changed[0] = True
+    for column in columns:
+        changed[1:] |= column[1:] != column[:-1]
+    return np.flatnonzero(changed)
+
+
+class Activity:
+    """
+    Atividade diária de cada arquivo: para cada (linha do arquivo, dia, autor), o churn
+    e quantas alterações houve. É a base compacta das séries por período: dias e semanas
+    saem daqui sem minerar de novo. Dias contam a partir de 01/01/1970 (UTC).
+    """
+
+    def __init__(self, file_names, author_names, rows, days, authors, churn, commits):
+        self.file_names = file_names
+        self.author_names = author_names
+        self.rows = rows
+        self.days = days
+        self.authors = authors
+        self.churn = churn
+        self.commits = commits
+        self._timelines = {}
+
+    @classmethod
+    def from_changes(cls, file_names, author_names, rows, timestamps, authors, churn) -> "Activity":
+        """Agrega alterações soltas: `rows[i]` mudou no instante `timestamps[i]`, por `authors[i]`, com `churn[i]` linhas."""
+        rows = np.asarray(rows, dtype=np.int64)
+        days = np.asarray(timestamps, dtype=np.int64) // DAY
+        authors = np.asarray(authors, dtype=np.int64)
+        churn = np.asarray(churn, dtype=np.int64)
+        order = np.lexsort((authors, days, rows))
+        rows, days, authors, churn = rows[order], days[order], authors[order], churn[order]
+        starts = _group_starts(rows, days, authors)
+        if not len(starts):
+            empty = np.empty(0, dtype=np.int64)
+            return cls(file_names, author_names, empty, empty, empty, empty, empty)
+        return cls(
+            file_names, author_names, rows[starts], days[starts], authors[starts],
+            np.add.reduceat(churn, starts), np.diff(np.r_[starts, len(rows)]),
+        )
+
+    def timeline(self, bucket: str = "week") -> "ChurnTimeline":
+        """Séries por período (`day` ou `week`), montadas uma vez por granularidade."""
+        if bucket not in BUCKETS:
+            raise ValueError(f"Período desconhecido: {bucket}. Opções: {', '.join(BUCKETS)}")
+        if bucket not in self._timelines:
+            self._timelines[bucket] = ChurnTimeline(self, bucket)
+        return self._timelines[bucket]
+
+
+class ChurnTimeline:
+    """
+    Churn, alterações e autores de cada arquivo por período, com somas de prefixo.
+
+    Só os pares (arquivo, período) com atividade são guardados, ordenados por arquivo e
+    período, com o acumulado de churn, de alterações e de churn × período. O total de
+    qualquer janela [lo, hi) sai da diferença entre dois acumulados: duas buscas binárias
+    por arquivo, vetorizadas para todos de uma vez, sem voltar ao histórico. A inclinação
+    da tendência usa as mesmas somas. Períodos são contados a partir do primeiro com
+    atividade (0 .. len(self) - 1).
+    """
+
+    def __init__(self, activity: Activity, bucket: str = "week"):
+        self.activity = activity
+        self.bucket = bucket
+        size = BUCKETS[bucket]
+        shift = _WEEK_SHIFT if size == 7 else 0
+        absolute = (activity.days + shift) // size
+        self.first = int(absolute.min()) if len(absolute) else 0
+        self.n_buckets = int(absolute.max()) - self.first + 1 if len(absolute) else 0
+        self._shift = shift
+        self._size = size
+        buckets = absolute - self.first
+        n_files = len(activity.file_names)
+        self.n_files = n_files
+
+        # Por (arquivo, período), somando os autores: as linhas de Activity já vêm por arquivo e dia
+        keys = activity.rows * max(self.n_buckets, 1) + buckets
+        starts = _group_starts(keys)
+        self._keys = keys[starts]
+        self._buckets = buckets[starts]
+        self.churn = np.add.reduceat(activity.churn, starts) if len(starts) else np.empty(0, dtype=np.int64)
+        commits = np.add.reduceat(activity.commits, starts) if len(starts) else np.empty(0, dtype=np.int64)
+        self._cum_churn = np.r_[0, np.cumsum(self.churn)]
+        self._cum_commits = np.r_[0, np.cumsum(commits)]
+        self._cum_moment = np.r_[0, np.cumsum(self.churn * self._buckets)]
+
+        # Autores distintos: cada (arquivo, autor, período) com atividade, em ordem de período, com o
+        # período anterior em que o mesmo autor mexeu no arquivo. Numa janela, a fatia contígua dela
+        # conta cada autor uma vez: só a primeira aparição tem o período anterior fora da janela
+        pairs = (activity.rows << 32) | activity.authors
+        order = np.lexsort((buckets, pairs))
+        pairs, author_buckets = pairs[order], buckets[order]
+        starts = _group_starts(pairs, author_buckets)
+        pairs, author_buckets = pairs[starts], author_buckets[starts]
+        first_of_pair = np.zeros(len(pairs), dtype=bool)
+        first_of_pair[_group_starts(pairs)] = True
+        previous = np.where(first_of_pair, -1, np.roll(author_buckets, 1))
+        order = np.argsort(author_buckets, kind="stable")
+        self._author_buckets = author_buckets[order]
+        self._author_rows = (pairs >> 32)[order]
+        self._author_previous = previous[order]
+
+    def __len__(self):
+        return self.n_buckets
+
+    def bucket_starts(self) -> np.ndarray:
+        """Instante (epoch, UTC) em que cada período começa."""
+        return ((np.arange(self.n_buckets) + self.first) * self._size - self._shift) * DAY
+
+    def bucket_of(self, timestamp: int) -> int:
+        """Período (relativo ao primeiro) que contém `timestamp`."""
+        return (int(timestamp) // DAY + self._shift) // self._size - self.first
+
+    def _positions(self, bucket: int) -> np.ndarray:
+        """Para cada arquivo, quantas entradas vêm antes do período `bucket` (índice nos acumulados)."""
+        base = np.arange(self.n_files, dtype=np.int64) * max(self.n_buckets, 1)
+        return np.searchsorted(self._keys, base + bucket)
+
+    def window(self, lo: int = 0, hi: int = None) -> pd.DataFrame:
+        """
+        Churn, alterações, autores distintos e inclinação da tendência (churn por período,
+        por período) de cada arquivo na janela [lo, hi). Só arquivos com atividade nela.
+        """
+        lo, hi = self._clip(lo, hi)
+        lower, upper = self._positions(lo), self._positions(hi)
+        churn = self._cum_churn[upper] - self._cum_churn[lower]
+        commits = self._cum_commits[upper] - self._cum_commits[lower]
+        moment = self._cum_moment[upper] - self._cum_moment[lower]
+
+        first, last = np.searchsorted(self._author_buckets, [lo, hi])
+        entering = self._author_previous[first:last] < lo
+        authors = np.bincount(self._author_rows[first:last][entering], minlength=self.n_files)
+
+        frame = pd.DataFrame({
+            "file": pd.Series(self.activity.file_names, dtype=object),
+            "churn": churn,
+            "commits": commits,
+            "authors": authors,
+            "trend": self._slope(churn, moment, lo, hi),
+        })
+        return frame[frame["commits"] > 0]
+
+    @staticmethod
+    def _slope(total, moment, lo: int, hi: int) -> np.ndarray:
+        """Mínimos quadrados de churn × período em [lo, hi), incluindo os períodos sem mudança."""
+        n = hi - lo
+        if n < 2:
+            return np.zeros(len(total))
+        t = np.arange(lo, hi, dtype=np.float64)
+        sum_t, sum_tt = t.sum(), (t * t).sum()
+        return (n * moment - sum_t * total) / (n * sum_tt - sum_t * sum_t)
+
+    def heating_up(self, lo: int = 0, hi: int = None, n: int = 10) -> pd.DataFrame:
+        """Os `n` arquivos cujo churn mais cresce na janela (inclinação positiva), do mais quente para o menos."""
+        frame = self.window(lo, hi)
+        frame = frame[frame["trend"] > 0]
+        return frame.sort_values(["trend", "file"], ascending=[False, True], kind="stable").head(n)
+
+    def series(self, rows, lo: int = 0, hi: int = None) -> np.ndarray:
+        """Churn por período na janela [lo, hi) dos arquivos `rows`: uma linha por arquivo, pronta para sparklines."""
+        lo, hi = self._clip(lo, hi)
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.zeros((len(rows), hi - lo), dtype=np.int64)
+        if not len(rows) or hi <= lo:
+            return out
+        base = rows * max(self.n_buckets, 1)
+        starts, ends = np.searchsorted(self._keys, base + lo), np.searchsorted(self._keys, base + hi)
+        sizes = ends - starts
+        entries = np.repeat(starts, sizes) + np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        out[np.repeat(np.arange(len(rows)), sizes), self._buckets[entries] - lo] = self.churn[entries]
+        return out
+
+    def _clip(self, lo: int, hi: int):
+        hi = self.n_buckets if hi is None else min(hi, self.n_buckets)
+        return max(0, lo), max(hi, max(0, lo))